@@ -9,6 +9,11 @@
 #				are listed as parameters to the abstract fucntion 'getAction'.
 #				Any agent will need to implement the getAction function,
 #				which returns an Action for every turn of the game.
+#				Agents may also override 'getActions', which returns a
+#				whole batch of Actions at once; by default it plays a
+#				single Action from 'getAction'. Agents that instrument
+#				themselves return what they measured from 'getStats',
+#				and agents that count their guesses from 'getGuesses'.
 #
 # NOTES: 		- An agent is anything that canbe viewed as perceiving its
 #				  environment through sensors and acting upon that
@@ -36,3 +41,18 @@ class AI:
 	@abstractmethod
 	def getAction(self, number: int) -> "Action Oject":
 		pass
+
+	def getActions(self, percepts: list) -> "list of Action Objects":
+		""" Return a batch of actions, which the World applies in order """
+		""" percepts holds one number per action of the previous batch that was applied; the World """
+		""" stops applying a batch when the game ends or an action is invalid, and when no action """
+		""" was applied it sends the last percept again. An empty batch ends the game. """
+		return [self.getAction(percepts[-1])]
+
+	def getGuesses(self) -> int:
+		""" Return how many cells the agent uncovered without knowing they were safe, if it counts them """
+		return None
+
+	def getStats(self) -> dict:
+		""" Return the instrumentation the agent collected during the game, if any """
+		return None
@@ -0,0 +1,68 @@
+import time
+from typing import Callable, Dict
+
+
+class AgentStats:
+	'''
+	Per-board timers and counters of MyAI. Instrumentation works by wrapping the bound methods
+	of one agent with timed or counted versions, so an agent that was never instrumented runs
+	exactly the code it would run without this module.
+
+	Every phase keeps its number of calls, the nanoseconds spent in it (perf_counter_ns, callees
+	included) and how many of its calls returned an action. Counters are plain named integers.
+	'''
+
+	def __init__(self):
+		self.calls : Dict[str, int] = {}
+		self.nanoseconds : Dict[str, int] = {}
+		self.actions : Dict[str, int] = {}
+		self.counters : Dict[str, int] = {}
+
+	def timed(self, phase: str, func: Callable) -> Callable:
+		calls = self.calls
+		nanoseconds = self.nanoseconds
+		actions = self.actions
+		calls[phase] = nanoseconds[phase] = actions[phase] = 0
+		clock = time.perf_counter_ns
+
+		def wrapper(*args):
+			start = clock()
+			result = func(*args)
+			nanoseconds[phase] += clock() - start
+			calls[phase] += 1
+			if result:
+				actions[phase] += 1
+			return result
+		return wrapper
+
+	def counted(self, counter: str, func: Callable, results: bool = False) -> Callable:
+		# Count the calls of func, or only those returning something when results is set
+		counters = self.counters
+		counters[counter] = 0
+
+		def wrapper(*args):
+			result = func(*args)
+			if result or not results:
+				counters[counter] += 1
+			return result
+		return wrapper
+
+	def count(self, counter: str, n: int = 1):
+		self.counters[counter] = self.counters.get(counter, 0) + n
+
+	def toDict(self) -> dict:
+		phases = {phase: {"calls": self.calls[phase], "ns": self.nanoseconds[phase], "actions": self.actions[phase]} for phase in self.calls}
+		return {"phases": phases, "counters": dict(self.counters)}
+
+
+__enabled = False
+
+def enableStats(enabled: bool = True):
+	'''
+	Turns the instrumentation of the MyAI agents created afterwards in this process on or off.
+	'''
+	global __enabled
+	__enabled = enabled
+
+def statsEnabled() -> bool:
+	return __enabled
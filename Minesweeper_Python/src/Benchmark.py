@@ -0,0 +1,324 @@
+# ==============================CS-199==================================
+# FILE:			Benchmark.py
+#
+# DESCRIPTION:	This file contains the benchmark suite of the agent and
+#				the engine. Micro-benchmarks time single operations of
+#				MyAI, its PriorityQueue and pattern deductions, and the
+#				setup of a World; macro-benchmarks play whole corpora of
+#				seeded worlds. Every world comes from WorldStream with a
+#				fixed seed, so every run plays exactly the same games.
+#
+# NOTES: 		- Syntax:
+#
+#					python3 Benchmark.py [Options]
+#
+#					Options:
+#						-b [Name] Only run the benchmarks whose name
+#						   contains Name. Can be given several times.
+#						-r [Repeat] Rounds of every benchmark, the
+#						   fastest one is kept (default 5).
+#						--save [File] Write the results to a baseline
+#						   file.
+#						--compare [File] Compare the results with a
+#						   baseline file, and exit with status 1 when a
+#						   benchmark is slower by more than the tolerance.
+#						--tolerance [Fraction] Allowed slowdown before a
+#						   benchmark counts as a regression (default 0.25).
+#
+#				- Every result is a time where lower is better: ns per
+#				  operation for micro-benchmarks, ms per board for
+#				  macro-benchmarks. Macro-benchmarks also record the
+#				  number of worlds won, which only changes when the
+#				  agent plays differently.
+#
+#				- Every result keeps the fastest round and the median
+#				  round. A benchmark only counts as a regression when
+#				  both are slower than the baseline by more than the
+#				  tolerance, so a single noisy round cannot fail it.
+#				  The garbage collector is off while a round is timed.
+#
+#				- The component cache shared by MyAI is cleared before
+#				  every round of a macro-benchmark.
+# ==============================CS-199==================================
+
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+from AI import AI
+from MyAI import MyAI, Cell, PriorityQueue
+from World import World
+from ComponentCache import sharedCache
+from GaussianSolver import numpy_installed
+from Tournament import playWorld
+from WorldStream import streamWorlds
+
+BENCHMARK_VERSION = 3
+BENCHMARK_SEED = 2024
+
+# Name: (difficulty, number of worlds)
+CORPORA = {
+	"beginner": ("beginner", 200),
+	"intermediate": ("intermediate", 100),
+	"expert": ("expert", 40),
+	"large": ("30x60x360", 8),
+}
+
+
+def corpus(name: str) -> list:
+	""" Return the seeded worlds of a corpus """
+	difficulty, numWorlds = CORPORA[name]
+	return list(streamWorlds(numWorlds, difficulty, BENCHMARK_SEED))
+
+
+def rounds(repeat: int, run: "function") -> list:
+	""" Call run repeat times, with the garbage collector off, and return its sorted results """
+	results = []
+	for _ in range(repeat):
+		enabled = gc.isenabled()
+		gc.collect()
+		gc.disable()
+		try:
+			results.append(run())
+		finally:
+			if enabled:
+				gc.enable()
+	return sorted(results)
+
+
+def timePerOp(setup: "function", body: "function", repeat: int) -> dict:
+	""" Return the ns per operation of body over the fastest and the median of repeat rounds """
+	""" setup builds the state of a round and is not timed, body returns its number of operations """
+	def run():
+		state = setup()
+		start = time.perf_counter_ns()
+		ops = body(state)
+		return (time.perf_counter_ns() - start) / ops
+	times = rounds(repeat, run)
+	return {"value": times[0], "median": times[len(times) // 2], "unit": "ns/op"}
+
+
+def playUntilGuess(world: "WorldDefinition") -> MyAI:
+	""" Play world with MyAI until it has to guess, and return the agent at that point """
+	rows, cols = world.rowDimension, world.colDimension
+	numbers = {}
+	for r in range(rows):
+		for c in range(cols):
+			numbers[c, r] = sum(world.isMine(x, y) for x in range(c-1, c+2) for y in range(r-1, r+2)
+				if 0 <= x < cols and 0 <= y < rows)
+	ai = MyAI(rows, cols, world.totalMines, world.startX, world.startY)
+	percepts = [numbers[world.startX, world.startY]]
+	while True:
+		actions = ai.getActions(percepts)
+		if ai.guessed or actions[0].getMove() == AI.Action.LEAVE:
+			return ai
+		percepts = [numbers[a.getX(), a.getY()] if a.getMove() == AI.Action.UNCOVER else -1 for a in actions]
+
+
+###############################################
+#				MICRO-BENCHMARKS			  #
+###############################################
+def benchAdjCells(repeat: int) -> dict:
+	""" getAdjCells over every cell of an expert board, filling its cache """
+	world = corpus("expert")[0]
+	ai = MyAI(world.rowDimension, world.colDimension, world.totalMines, world.startX, world.startY)
+	def setup():
+		ai._adj_cells = {}
+		return ai
+	def body(ai):
+		for pos in ai.positions:
+			ai.getAdjCells(pos)
+		return len(ai.positions)
+	return timePerOp(setup, body, repeat)
+
+
+def benchPriorityQueue(repeat: int) -> dict:
+	""" Push 4096 cells, update a quarter of them, remove a quarter and pop the rest """
+	rng = random.Random(BENCHMARK_SEED)
+	cells = [Cell((i % 64, i // 64), rng.randrange(-2, 9)) for i in range(4096)]
+	for cell in cells:
+		cell.reduced_value = cell.value
+	def setup():
+		return PriorityQueue[Cell](Cell.priority, lambda cell: cell.pos)
+	def body(queue):
+		for cell in cells:
+			queue.push(cell)
+		for cell in cells[::4]:
+			queue.push(cell)
+		for cell in cells[1::4]:
+			queue.remove(cell)
+		while queue.pop() is not None:
+			pass
+		return len(cells)
+	return timePerOp(setup, body, repeat)
+
+
+def frontierAgents() -> list:
+	""" Agents stopped at their first guess on the expert corpus, with the cells of their frontier """
+	agents = []
+	for world in corpus("expert")[:10]:
+		ai = playUntilGuess(world)
+		agents.append((ai, list(ai.store.constraints)))
+	return agents
+
+
+def benchDeduce(repeat: int, agents: list) -> dict:
+	""" ConstraintStore.deduce on every frontier cell """
+	def body(agents):
+		ops = 0
+		for ai, frontier in agents:
+			for pos in frontier:
+				ai.store.deduce(pos)
+			ops += len(frontier)
+		return ops
+	return timePerOp(lambda: agents, body, repeat)
+
+
+def benchPatternLookup(repeat: int, agents: list) -> dict:
+	""" Encoding and looking up the pattern window of every frontier cell """
+	def body(agents):
+		ops = 0
+		for ai, frontier in agents:
+			patterns = ai.patterns
+			for pos in frontier:
+				shape = ai.windowShape(pos)
+				if shape in patterns.shapes:
+					patterns.lookup(ai.windowKey(pos, shape))
+			ops += len(frontier)
+		return ops
+	return timePerOp(lambda: agents, body, repeat)
+
+
+def benchWorldSetup(repeat: int, name: str) -> dict:
+	""" Building a World and its MyAI from a definition """
+	worlds = corpus(name)[:20]
+	def body(worlds):
+		for world in worlds:
+			World(world=world)
+		return len(worlds)
+	return timePerOp(lambda: worlds, body, repeat)
+
+
+###############################################
+#				MACRO-BENCHMARKS			  #
+###############################################
+def benchGames(repeat: int, name: str) -> dict:
+	""" Play a whole corpus, returning the ms per board of the fastest and the median round and the worlds won """
+	worlds = corpus(name)
+	tasks = [(world, "myai", False, False, BENCHMARK_SEED, False, 0, False) for world in worlds]
+	def run():
+		sharedCache().clear()
+		start = time.perf_counter()
+		wins = sum(playWorld(task)[0]["score"] > 0 for task in tasks)
+		return (time.perf_counter() - start) * 1000 / len(tasks), wins
+	results = rounds(repeat, run)
+	elapsed, wins = results[0]
+	return {"value": elapsed, "median": results[len(results) // 2][0], "unit": "ms/board", "boards": len(tasks), "wins": wins}
+
+
+def runBenchmarks(selected: list, repeat: int) -> dict:
+	""" Run the benchmarks whose name contains one of selected, or all of them """
+	def wanted(name):
+		return not selected or any(s in name for s in selected)
+
+	results = {}
+	def record(name, result):
+		results[name] = result
+		print("{:<32} {:>12.1f} {}".format(name, result["value"], result["unit"]), flush=True)
+
+	if wanted("micro.getAdjCells"):
+		record("micro.getAdjCells", benchAdjCells(repeat))
+	if wanted("micro.PriorityQueue"):
+		record("micro.PriorityQueue", benchPriorityQueue(repeat))
+	if wanted("micro.ConstraintStore.deduce") or wanted("micro.PatternTable.lookup"):
+		agents = frontierAgents()
+		if wanted("micro.ConstraintStore.deduce"):
+			record("micro.ConstraintStore.deduce", benchDeduce(repeat, agents))
+		if wanted("micro.PatternTable.lookup"):
+			record("micro.PatternTable.lookup", benchPatternLookup(repeat, agents))
+	for name in CORPORA:
+		if wanted("micro.World.setup." + name):
+			record("micro.World.setup." + name, benchWorldSetup(repeat, name))
+	for name in CORPORA:
+		if wanted("macro." + name):
+			# Whole games are long enough to be timed in fewer rounds
+			record("macro." + name, benchGames(max(1, repeat // 2), name))
+	return results
+
+
+def compareResults(results: dict, baseline: dict, tolerance: float) -> bool:
+	""" Print every result next to its baseline, and return True when one regressed beyond tolerance """
+	""" in its fastest round and, when the baseline has one, in its median round """
+	regressed = False
+	print("{:<32} {:>12} {:>12} {:>8}".format("benchmark", "baseline", "current", "ratio"))
+	for name, result in results.items():
+		base = baseline.get(name)
+		if base is None or base["unit"] != result["unit"]:
+			print("{:<32} {:>12} {:>12.1f} {:>8}".format(name, "-", result["value"], "new"))
+			continue
+		ratio = result["value"] / base["value"] if base["value"] else float("inf")
+		median = ratio
+		if base.get("median"):
+			median = result["median"] / base["median"]
+		flag = ""
+		if ratio > 1 + tolerance and median > 1 + tolerance:
+			flag = "  REGRESSION"
+			regressed = True
+		elif ratio > 1 + tolerance:
+			flag = "  noise (median {:.3f})".format(median)
+		elif ratio < 1 - tolerance:
+			flag = "  faster"
+		if base.get("wins") is not None and base.get("wins") != result.get("wins"):
+			flag += "  (wins {} -> {})".format(base["wins"], result["wins"])
+		print("{:<32} {:>12.1f} {:>12.1f} {:>8.3f}{}".format(name, base["value"], result["value"], ratio, flag))
+	return regressed
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark MyAI and the World engine on seeded worlds.", prog="Benchmark.py")
+	parser.add_argument("-b", "--bench", action="append", help="only run benchmarks whose name contains this")
+	parser.add_argument("-r", "--repeat", type=int, default=5, help="rounds of every benchmark, the fastest is kept")
+	parser.add_argument("--save", help="baseline file to write the results to")
+	parser.add_argument("--compare", help="baseline file to compare the results with")
+	parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a regression")
+	args = parser.parse_args()
+
+	baseline = None
+	if args.compare:
+		try:
+			with open(args.compare) as file:
+				baseline = json.load(file)
+		except (OSError, ValueError):
+			print("ERROR: Could not read the baseline file!")
+			return 2
+		if baseline.get("version") != BENCHMARK_VERSION:
+			print("ERROR: The baseline file comes from another version of the benchmarks!")
+			return 2
+
+	results = runBenchmarks(args.bench, max(1, args.repeat))
+
+	if args.save:
+		try:
+			with open(args.save, 'w') as file:
+				json.dump({
+					"version": BENCHMARK_VERSION,
+					"python": platform.python_version(),
+					"numpy": numpy_installed,
+					"benchmarks": results,
+				}, file, indent=1)
+		except OSError:
+			print("ERROR: Could not write the baseline file!")
+			return 2
+
+	if baseline is not None:
+		print()
+		if compareResults(results, baseline["benchmarks"], args.tolerance):
+			return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
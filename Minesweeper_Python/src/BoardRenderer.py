@@ -0,0 +1,104 @@
+# ==============================CS-199==================================
+# FILE:			BoardRenderer.py
+#
+# DESCRIPTION:	This file contains the BoardRenderer class, which draws
+#				the board of a World in debug and manual modes. Every
+#				frame is built in a single buffer and written at once.
+#				On a terminal, a frame that follows another one only
+#				rewrites the tiles and the lines that changed, moving
+#				the cursor with ANSI escape codes.
+#
+# NOTES: 		- Tiles are given as one character each, in the World
+#				  order: tile (c, r) at index r * colDimension + c, with
+#				  row 0 drawn at the bottom.
+#
+#				- Cursor moves are relative to the line under the last
+#				  frame, so the board has to fit in the terminal. Any
+#				  output written under a frame must be followed by
+#				  invalidate, so the next frame is drawn in full under
+#				  it instead of over it.
+# ==============================CS-199==================================
+
+import sys
+
+ESC = "\x1b["
+
+
+class BoardRenderer():
+
+	def __init__(self, rowDimension: int, colDimension: int, ansi: bool = None, out = None):
+		self.__rowDimension = rowDimension
+		self.__colDimension = colDimension
+		self.__out = out if out is not None else sys.stdout
+		self.__ansi = self.__out.isatty() if ansi is None else ansi
+		self.__tiles = None
+		self.__lines = None
+		self.__header = 0
+
+		# The lines under the board never change
+		border = "   " + "---" * colDimension
+		labels = "     " + "".join(str(c).ljust(3) for c in range(1, colDimension+1))
+		self.__bottom = [border, labels]
+
+	def invalidate(self) -> None:
+		""" Forget the last frame, so the next one is drawn in full """
+		self.__tiles = None
+
+	def render(self, tiles: str, header: list, footer: list) -> None:
+		""" Draw the header lines, the board and the footer lines """
+		buffer = []
+		if self.__tiles is None or not self.__ansi or len(header) + len(footer) + self.__rowDimension + 2 != len(self.__lines):
+			buffer.append("\n".join(self.__frame(tiles, header, footer)))
+			buffer.append("\n")
+		else:
+			self.__diff(tiles, header, footer, buffer)
+		self.__out.write("".join(buffer))
+		self.__out.flush()
+
+	def __frame(self, tiles: str, header: list, footer: list) -> list:
+		""" Return every line of a full frame, and remember it """
+		cols = self.__colDimension
+		lines = list(header)
+		for r in range(self.__rowDimension - 1, -1, -1):
+			row = tiles[r * cols:(r+1) * cols]
+			lines.append(" " + str(r+1).ljust(2) + "| " + "".join(tile + "  " for tile in row))
+		lines.extend(self.__bottom)
+		lines.extend(footer)
+		self.__tiles = tiles
+		self.__lines = lines
+		self.__header = len(header)
+		return lines
+
+	def __diff(self, tiles: str, header: list, footer: list, buffer: list) -> None:
+		""" Add to buffer the cursor moves and text that turn the last frame into this one """
+		cols = self.__colDimension
+		top = self.__header
+		total = len(self.__lines)
+		current = total
+		def moveTo(line, column):
+			nonlocal current
+			if line < current:
+				buffer.append(ESC + str(current - line) + "A")
+			elif line > current:
+				buffer.append(ESC + str(line - current) + "B")
+			buffer.append(ESC + str(column) + "G")
+			current = line
+
+		for i, (old, new) in enumerate(zip(self.__tiles, tiles)):
+			if old != new:
+				r, c = divmod(i, cols)
+				moveTo(top + self.__rowDimension - 1 - r, 6 + 3 * c)
+				buffer.append(new)
+		self.__tiles = tiles
+
+		for k, line in enumerate(header):
+			if line != self.__lines[k]:
+				moveTo(k, 1)
+				buffer.append(ESC + "2K" + line)
+				self.__lines[k] = line
+		for k, line in enumerate(footer, total - len(footer)):
+			if line != self.__lines[k]:
+				moveTo(k, 1)
+				buffer.append(ESC + "2K" + line)
+				self.__lines[k] = line
+		moveTo(total, 1)
@@ -0,0 +1,132 @@
+import os
+import pickle
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from FrontierSolver import ComponentSolution, Constraint
+
+CACHE_VERSION = 1
+
+# The 8 symmetries of the board, as maps of cell positions
+SYMMETRIES = [
+	lambda x, y: (x, y),
+	lambda x, y: (-y, x),
+	lambda x, y: (-x, -y),
+	lambda x, y: (y, -x),
+	lambda x, y: (-x, y),
+	lambda x, y: (x, -y),
+	lambda x, y: (y, x),
+	lambda x, y: (-y, -x),
+]
+
+
+def canonicalComponent(component: List[Constraint]) -> Tuple[tuple, Dict[tuple, tuple]]:
+	'''
+	Returns the canonical form of a component, the same for every translation, rotation and
+	reflection of it: its constraints with cells moved next to the origin, sorted, taking the
+	smallest over the 8 symmetries. Also returns where each cell of the component went.
+	'''
+	cells = set(cell for constraint_cells, _ in component for cell in constraint_cells)
+	best = None
+	for symmetry in SYMMETRIES:
+		moved = {cell: symmetry(*cell) for cell in cells}
+		min_x = min(x for x, _ in moved.values())
+		min_y = min(y for _, y in moved.values())
+		moved = {cell: (x - min_x, y - min_y) for cell, (x, y) in moved.items()}
+		key = tuple(sorted((tuple(sorted(moved[cell] for cell in constraint_cells)), mines) for constraint_cells, mines in component))
+		if best is None or key < best[0]:
+			best = (key, moved)
+	return best
+
+
+class ComponentCache:
+	'''
+	A bounded LRU cache of solved components, meant to be shared by every MyAI of a process,
+	since the same small frontier shapes come back game after game. Components are stored
+	under their canonical form, each entry holding the solution counts and per cell counts
+	(from which forced() gets the forced cells) in canonical coordinates. Only complete
+	solutions are cached.
+
+	hits, misses and evictions count the cache traffic, and save / load keep a snapshot on disk.
+	'''
+
+	def __init__(self, capacity: int = 4096):
+		self.capacity = capacity
+		self.entries : 'OrderedDict[tuple, ComponentSolution]' = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def get(self, component: List[Constraint]) -> Tuple[ComponentSolution, tuple]:
+		'''
+		Returns the cached solution of the component mapped onto its own cells, or None on a miss,
+		and the canonical form to put its solution under.
+		'''
+		canonical = canonicalComponent(component)
+		key, moved = canonical
+		entry = self.entries.get(key)
+		if entry is None:
+			self.misses += 1
+			return None, canonical
+		self.hits += 1
+		self.entries.move_to_end(key)
+		original = {moved_cell: cell for cell, moved_cell in moved.items()}
+		solution = ComponentSolution([original[cell] for cell in entry.cells])
+		solution.counts = entry.counts
+		solution.cell_counts = entry.cell_counts
+		return solution, canonical
+
+	def put(self, canonical: tuple, solution: ComponentSolution):
+		if not solution.complete:
+			return
+		key, moved = canonical
+		entry = ComponentSolution([moved[cell] for cell in solution.cells])
+		entry.counts = solution.counts
+		entry.cell_counts = solution.cell_counts
+		self.entries[key] = entry
+		self.entries.move_to_end(key)
+		while len(self.entries) > self.capacity:
+			self.entries.popitem(last=False)
+			self.evictions += 1
+
+	def clear(self):
+		self.entries.clear()
+		self.hits = self.misses = self.evictions = 0
+
+	def stats(self) -> dict:
+		return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+	def save(self, filename: str):
+		'''
+		Writes the entries to filename, least recently used first.
+		'''
+		entries = [(key, entry.cells, entry.counts, entry.cell_counts) for key, entry in self.entries.items()]
+		with open(filename, "wb") as f:
+			pickle.dump((CACHE_VERSION, entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+	def load(self, filename: str):
+		'''
+		Adds the entries of a snapshot written by save. A missing or outdated snapshot is ignored.
+		'''
+		if not os.path.isfile(filename):
+			return
+		with open(filename, "rb") as f:
+			version, entries = pickle.load(f)
+		if version != CACHE_VERSION:
+			return
+		for key, cells, counts, cell_counts in entries:
+			entry = ComponentSolution(cells)
+			entry.counts = counts
+			entry.cell_counts = cell_counts
+			self.entries[key] = entry
+		while len(self.entries) > self.capacity:
+			self.entries.popitem(last=False)
+
+
+__shared = ComponentCache()
+
+def sharedCache() -> ComponentCache:
+	'''
+	Returns the cache shared by every MyAI of this process.
+	'''
+	return __shared
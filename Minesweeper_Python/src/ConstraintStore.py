@@ -0,0 +1,96 @@
+from typing import Dict, Set, Tuple
+
+
+class ConstraintStore:
+	'''
+	The constraints of the frontier: for every revealed number with unknown neighbours,
+	the bitmask of those neighbours and how many mines they hold. Constraints are indexed
+	by the bits of their unknown cells, so the constraints overlapping a given one are a
+	few dictionary lookups away, and exploring a cell updates exactly the constraints on it.
+
+	deduce applies one rule to every pair of overlapping constraints A and B: the mines in
+	A & B are at least n_A - |A - B| and n_B - |B - A|, and at most min(|A & B|, n_A, n_B),
+	so B - A holds between n_B - max and n_B - min of them. When that range is pinned to
+	0 the cells of B - A are safe, and when it reaches |B - A| they are all mines.
+	A subset A of B is the special case min = max = n_A, which covers the 1-1, hole and
+	T patterns, and the bounds cover the 1-2 patterns.
+	'''
+
+	def __init__(self):
+		self.constraints : Dict[tuple, Tuple[int, int]] = {}
+		self.by_cell : Dict[int, Set[tuple]] = {}
+
+	def add(self, owner: tuple, mask: int, mines: int):
+		'''
+		Adds the constraint of the revealed cell owner: mask holds exactly mines mines.
+		'''
+		if not mask:
+			return
+		self.constraints[owner] = (mask, mines)
+		while mask:
+			low = mask & -mask
+			self.by_cell.setdefault(low.bit_length() - 1, set()).add(owner)
+			mask ^= low
+
+	def explore(self, index: int, mine: bool):
+		'''
+		Removes the cell at bit index from every constraint on it, with one mine less if it was flagged.
+		Constraints left without unknown cells are dropped.
+		'''
+		bit = 1 << index
+		for owner in self.by_cell.pop(index, ()):
+			mask, mines = self.constraints[owner]
+			mask &= ~bit
+			if mask:
+				self.constraints[owner] = (mask, mines - mine)
+			else:
+				del self.constraints[owner]
+
+	def overlapping(self, owner: tuple) -> Set[tuple]:
+		'''
+		Returns the other constraints sharing an unknown cell with the constraint of owner.
+		'''
+		others = set()
+		mask = self.constraints[owner][0]
+		while mask:
+			low = mask & -mask
+			others |= self.by_cell[low.bit_length() - 1]
+			mask ^= low
+		others.discard(owner)
+		return others
+
+	def deduce(self, owner: tuple) -> Tuple[int, int]:
+		'''
+		Returns the masks of the cells proven safe and proven mines by the constraint of owner,
+		on its own and paired with every constraint it overlaps.
+		'''
+		if owner not in self.constraints:
+			return 0, 0
+		a, na = self.constraints[owner]
+		size_a = a.bit_count()
+		if na == 0:
+			return a, 0
+		if na == size_a:
+			return 0, a
+
+		safe = mines = 0
+		for other in self.overlapping(owner):
+			b, nb = self.constraints[other]
+			shared = a & b
+			only_a = a & ~b
+			only_b = b & ~a
+			size_only_a = only_a.bit_count()
+			size_only_b = only_b.bit_count()
+			low = max(0, na - size_only_a, nb - size_only_b)
+			high = min(shared.bit_count(), na, nb)
+			if only_a:
+				if na == low:
+					safe |= only_a
+				elif na - high == size_only_a:
+					mines |= only_a
+			if only_b:
+				if nb == low:
+					safe |= only_b
+				elif nb - high == size_only_b:
+					mines |= only_b
+		return safe, mines
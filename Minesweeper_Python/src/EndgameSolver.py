@@ -0,0 +1,119 @@
+from collections import deque
+from typing import Dict, List, Tuple
+
+
+class EndgameSolver:
+	'''
+	Exact solver for the end of a game, when few cells are left covered. Every unknown cell
+	of the board is enumerated together, interior cells included, and only the assignments
+	using exactly the remaining mines are counted, so deductions that need the global mine
+	count are found.
+
+	Cells are decided one at a time in an order that closes constraints early, and the search
+	is memoized on (cell, mines left, needs of the constraints that are partly decided), since
+	two different pasts with the same open needs have the same futures. Each memo entry holds
+	the number of completions and, for every later cell, how many of them put a mine there.
+
+	max_cells is the number of unknown cells below which MyAI switches to it.
+	'''
+
+	def __init__(self, max_cells: int = 48):
+		self.max_cells = max_cells
+
+	def solve(self, cells: List[int], constraints: List[Tuple[int, int]], mines: int) -> List[float]:
+		'''
+		cells are the bit indices of the unknown cells, constraints (mask, mines) pairs over them,
+		and mines the number of mines left. Returns the mine probability of every cell, in order,
+		or None if no assignment is consistent.
+		'''
+		order = self.order(cells, constraints)
+		n = len(order)
+		position = {cell: i for i, cell in enumerate(order)}
+		need = [count for _, count in constraints]
+		cell_constraints : List[List[int]] = [[] for _ in range(n)]
+		first = [n] * len(constraints)
+		last = [-1] * len(constraints)
+		for c, (mask, _) in enumerate(constraints):
+			while mask:
+				low = mask & -mask
+				i = position[low.bit_length() - 1]
+				cell_constraints[i].append(c)
+				first[c] = min(first[c], i)
+				last[c] = max(last[c], i)
+				mask ^= low
+		# The constraints with cells on both sides of the boundary before cell i
+		active = [[c for c in range(len(constraints)) if first[c] < i <= last[c]] for i in range(n + 1)]
+		remaining = [bin(mask).count("1") for mask, _ in constraints]
+		memo : Dict[tuple, Tuple[int, List[int]]] = {}
+
+		def count(i: int, mines: int) -> Tuple[int, List[int]]:
+			if mines < 0 or mines > n - i:
+				return 0, []
+			if i == n:
+				return 1, []
+			key = (i, mines, tuple(need[c] for c in active[i]))
+			if key in memo:
+				return memo[key]
+			total = 0
+			per_cell = [0] * (n - i)
+			for value in (0, 1):
+				feasible = True
+				for c in cell_constraints[i]:
+					if need[c] - value < 0 or need[c] - value > remaining[c] - 1:
+						feasible = False
+				if not feasible:
+					continue
+				for c in cell_constraints[i]:
+					need[c] -= value
+					remaining[c] -= 1
+				sub_total, sub_cells = count(i + 1, mines - value)
+				for c in cell_constraints[i]:
+					need[c] += value
+					remaining[c] += 1
+				if sub_total:
+					total += sub_total
+					per_cell[0] += value * sub_total
+					for j, sub_count in enumerate(sub_cells):
+						per_cell[j + 1] += sub_count
+			memo[key] = (total, per_cell)
+			return total, per_cell
+
+		total, per_cell = count(0, mines)
+		if total == 0:
+			return None
+		probabilities = dict(zip(order, per_cell))
+		return [probabilities[cell] / total for cell in cells]
+
+	def order(self, cells: List[int], constraints: List[Tuple[int, int]]) -> List[int]:
+		# Constrained cells first, constraint by constraint breadth first so that each one is
+		# closed soon after it is opened, then the cells no constraint touches.
+		by_cell : Dict[int, List[int]] = {}
+		for c, (mask, _) in enumerate(constraints):
+			while mask:
+				low = mask & -mask
+				by_cell.setdefault(low.bit_length() - 1, []).append(c)
+				mask ^= low
+		order = []
+		placed = set()
+		seen = set()
+		for start in range(len(constraints)):
+			if start in seen:
+				continue
+			seen.add(start)
+			queue = deque([start])
+			while queue:
+				mask = constraints[queue.popleft()][0]
+				while mask:
+					low = mask & -mask
+					cell = low.bit_length() - 1
+					mask ^= low
+					if cell in placed:
+						continue
+					placed.add(cell)
+					order.append(cell)
+					for other in by_cell[cell]:
+						if other not in seen:
+							seen.add(other)
+							queue.append(other)
+		order.extend(cell for cell in cells if cell not in placed)
+		return order
@@ -0,0 +1,230 @@
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+
+# A constraint is (unknown cells around a revealed number, mines left among them)
+Constraint = Tuple[Tuple[tuple, ...], int]
+
+
+class ComponentSolution:
+	'''
+	Every solution of one connected component of the frontier, grouped by mine count.
+	counts[k] is the number of solutions placing k mines in the component, and
+	cell_counts[k][i] is how many of those have a mine on cells[i].
+	A component whose search ran out of time is not complete, and only tells us its cells,
+	until MineSampler fills counts and cell_counts with estimates (samples > 0).
+	key is the frozenset of constraints the component was solved from.
+	'''
+	def __init__(self, cells: List[tuple], complete: bool = True):
+		self.cells = cells
+		self.complete = complete
+		self.key : frozenset = None
+		self.samples = 0
+		self.counts : Dict[int, int] = {}
+		self.cell_counts : Dict[int, List[int]] = {}
+
+	def total(self) -> int:
+		return sum(self.counts.values())
+
+	def forced(self) -> Tuple[List[tuple], List[tuple]]:
+		'''
+		Returns the cells that are safe in every solution and the cells that are mines in every solution.
+		'''
+		if not self.complete or not self.counts:
+			return [], []
+		total = self.total()
+		mines_per_cell = [0] * len(self.cells)
+		for k, counts in self.cell_counts.items():
+			for i, count in enumerate(counts):
+				mines_per_cell[i] += count
+		safe = [cell for cell, mines in zip(self.cells, mines_per_cell) if mines == 0]
+		mines = [cell for cell, mines in zip(self.cells, mines_per_cell) if mines == total]
+		return safe, mines
+
+
+__deadlines = False
+
+def enableDeadlines(enabled: bool = True):
+	'''
+	Turns the wall-clock caps of the solvers of the MyAI agents created afterwards in this
+	process on or off. A game then depends on the load of the machine, so seeded runs keep
+	them off and are only bounded by node and sample counts.
+	'''
+	global __deadlines
+	__deadlines = enabled
+
+def deadlinesEnabled() -> bool:
+	return __deadlines
+
+
+class FrontierSolver:
+	'''
+	Exact constraint solver over the frontier. The constraints are split into connected
+	components (two constraints are connected when they share an unknown cell), and each
+	component is enumerated by backtracking, pruning as soon as a constraint can no longer
+	be met. Solutions are kept by component, so a component that did not change since the
+	previous call is not solved again.
+
+	max_nodes caps the search nodes of each component, so whether a component is finished
+	only depends on the component, and components with more than max_cells unknowns are not
+	enumerated at all. time_budget optionally caps the seconds spent solving per call as well.
+	With a ComponentCache, components solved before, in this game or another, are not solved
+	again, and new ones are solved in their canonical form, so the cache never changes which
+	components get finished.
+	'''
+
+	def __init__(self, max_nodes: int = 20000, max_cells: int = 48, cache = None, time_budget: float = None):
+		self.max_nodes = max_nodes
+		self.max_cells = max_cells
+		self.cache = cache
+		self.time_budget = time_budget
+		self.solved : Dict[frozenset, ComponentSolution] = {}
+
+	def components(self, constraints: List[Constraint]) -> List[List[Constraint]]:
+		'''
+		Splits the constraints into groups that share no unknown cell, with union-find over the cells.
+		'''
+		parent = {}
+		def find(cell):
+			root = cell
+			while parent[root] != root:
+				root = parent[root]
+			while parent[cell] != root:
+				parent[cell], cell = root, parent[cell]
+			return root
+
+		for cells, _ in constraints:
+			for cell in cells:
+				parent.setdefault(cell, cell)
+			first = find(cells[0])
+			for cell in cells[1:]:
+				root = find(cell)
+				if root != first:
+					parent[root] = first
+
+		groups : Dict[tuple, List[Constraint]] = {}
+		for constraint in constraints:
+			groups.setdefault(find(constraint[0][0]), []).append(constraint)
+		return list(groups.values())
+
+	def solve(self, constraints: List[Constraint]) -> List[ComponentSolution]:
+		'''
+		Returns the solutions of every component, smallest components first.
+		Components are looked up by their constraints, so only new or changed ones are enumerated.
+		'''
+		deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+		components = sorted(self.components(constraints), key=len)
+		solved = {}
+		solutions = []
+		for component in components:
+			key = frozenset(component)
+			solution = self.solved.get(key)
+			if solution is None:
+				if self.cache is None:
+					solution = self.solveComponent(component, deadline)
+				else:
+					solution, canonical = self.cache.get(component)
+					if solution is None:
+						solution = self.solveCanonical(canonical, deadline)
+						self.cache.put(canonical, solution)
+				solution.key = key
+			solved[key] = solution
+			solutions.append(solution)
+		self.solved = solved
+		return solutions
+
+	def solveCanonical(self, canonical: tuple, deadline: float) -> ComponentSolution:
+		'''
+		Solves the canonical form of a component, as given by the cache, and maps the solution
+		back onto the cells of the component.
+		'''
+		key, moved = canonical
+		original = {moved_cell: cell for cell, moved_cell in moved.items()}
+		found = self.solveComponent(list(key), deadline)
+		solution = ComponentSolution([original[cell] for cell in found.cells], found.complete)
+		solution.counts = found.counts
+		solution.cell_counts = found.cell_counts
+		return solution
+
+	def solveComponent(self, component: List[Constraint], deadline: float) -> ComponentSolution:
+		# Order the cells so that each constraint is closed as early as possible:
+		# walk the constraints breadth first and number their cells in that order.
+		by_cell : Dict[tuple, List[int]] = {}
+		for c, (constraint_cells, _) in enumerate(component):
+			for cell in constraint_cells:
+				by_cell.setdefault(cell, []).append(c)
+		cell_index : Dict[tuple, int] = {}
+		cells : List[tuple] = []
+		start = min(range(len(component)), key=lambda c: len(component[c][0]))
+		seen = {start}
+		queue = deque([start])
+		while queue:
+			for cell in component[queue.popleft()][0]:
+				if cell in cell_index:
+					continue
+				cell_index[cell] = len(cells)
+				cells.append(cell)
+				for other in by_cell[cell]:
+					if other not in seen:
+						seen.add(other)
+						queue.append(other)
+
+		solution = ComponentSolution(cells)
+		n = len(cells)
+		if n > self.max_cells:
+			solution.complete = False
+			return solution
+
+		need = [mines for _, mines in component]
+		unassigned = [len(constraint_cells) for constraint_cells, _ in component]
+		assigned = [0] * len(component)
+		cell_constraints : List[List[int]] = [[] for _ in range(n)]
+		for c, (constraint_cells, _) in enumerate(component):
+			for cell in constraint_cells:
+				cell_constraints[cell_index[cell]].append(c)
+
+		values = [0] * n
+		counts = solution.counts
+		cell_counts = solution.cell_counts
+		nodes = 0
+		max_nodes = self.max_nodes
+
+		def search(i: int, mines: int) -> bool:
+			nonlocal nodes
+			nodes += 1
+			if max_nodes is not None and nodes > max_nodes:
+				return False
+			if deadline is not None and nodes & 1023 == 0 and time.perf_counter() > deadline:
+				return False
+			if i == n:
+				counts[mines] = counts.get(mines, 0) + 1
+				per_cell = cell_counts.get(mines)
+				if per_cell is None:
+					per_cell = cell_counts[mines] = [0] * n
+				for j in range(n):
+					if values[j]:
+						per_cell[j] += 1
+				return True
+			constraints_here = cell_constraints[i]
+			for value in (0, 1):
+				feasible = True
+				for c in constraints_here:
+					unassigned[c] -= 1
+					assigned[c] += value
+					if assigned[c] > need[c] or assigned[c] + unassigned[c] < need[c]:
+						feasible = False
+				ok = True
+				if feasible:
+					values[i] = value
+					ok = search(i + 1, mines + value)
+					values[i] = 0
+				for c in constraints_here:
+					unassigned[c] += 1
+					assigned[c] -= value
+				if not ok:
+					return False
+			return True
+
+		if not search(0, 0):
+			solution.complete = False
+		return solution
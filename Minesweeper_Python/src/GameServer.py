@@ -0,0 +1,286 @@
+# ==============================CS-199==================================
+# FILE:			GameServer.py
+#
+# DESCRIPTION:	This file contains the GameServer class, a long-lived
+#				process that hosts many Minesweeper World sessions at
+#				once for agents running in other processes, so they can
+#				play thousands of games without paying the startup of
+#				Main.py for every one of them.
+#				The server runs on asyncio and speaks JSON Lines, one
+#				request and one response per line, over a Unix socket
+#				or over stdin/stdout.
+#
+# NOTES: 		- Syntax:
+#
+#					python3 GameServer.py [--socket Path | --stdio]
+#
+#					Options:
+#						--socket [Path] Listen on a Unix socket.
+#						--stdio Serve a single client on stdin/stdout,
+#						   which may also be redirected from or to files.
+#						--max-sessions [N] Games open at the same time,
+#						   across every client (default 1024).
+#						--idle-timeout [Seconds] Games without a request
+#						   for that long are closed (default 300).
+#
+#				- Requests, where "id" is optional and copied into the
+#				  response:
+#
+#					{"op": "new", "difficulty": "expert", "seed": 1, "index": 0}
+#					{"op": "new", "corpus": "worlds.corpus", "board": 12}
+#					   Start a game on world index of the WorldStream of
+#					   that difficulty and seed (a random seed when none
+#					   is given), or on a board of a world corpus. The
+#					   response holds "game", "rows", "cols", "mines",
+#					   "start" ([x, y]) and the "percept" of the start.
+#					{"op": "act", "game": 3, "actions": [["uncover", 4, 2], ["flag", 0, 1]]}
+#					   Apply a batch of actions, each one [move, x, y]
+#					   with 0-indexed coordinates and move one of leave,
+#					   uncover, flag or unflag. The response holds the
+#					   "percepts", as AI.getActions receives them, and
+#					   "over". Once over, it also holds "score" and
+#					   "outcome", and the game is closed.
+#					{"op": "close", "game": 3}
+#					{"op": "status"}
+#
+#				- A failed request gets {"ok": false, "error": ...},
+#				  every other response has "ok": true.
+#
+#				- Memory is bounded: a game is a few bytes per tile,
+#				  the number of open games is capped, idle games are
+#				  closed, a client's games are closed when it leaves,
+#				  and request lines are limited in length.
+# ==============================CS-199==================================
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from types import SimpleNamespace
+from AI import AI
+from Action import Action
+from World import World
+from Tournament import openCorpus
+from WorldStream import generateWorld, parseDifficulty
+
+LINE_LIMIT = 1 << 20
+MOVES = {
+	"leave": AI.Action.LEAVE,
+	"uncover": AI.Action.UNCOVER,
+	"flag": AI.Action.FLAG,
+	"unflag": AI.Action.UNFLAG,
+}
+
+
+class GameServer():
+
+	def __init__(self, maxSessions: int = 1024, idleTimeout: float = 300):
+		self.maxSessions = maxSessions
+		self.idleTimeout = idleTimeout
+		# Game id: (World, rowDimension, colDimension, owning client)
+		self.sessions = {}
+		self.lastUsed = {}
+		self.nextGame = 1
+		self.gamesPlayed = 0
+
+	async def handleClient(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+		""" Answer the requests of one client, one line each, until it disconnects """
+		client = object()
+		try:
+			while True:
+				try:
+					line = await reader.readline()
+				except ValueError:
+					# The line is over LINE_LIMIT, and the stream cannot be resynchronized
+					writer.write(self.__encode({"ok": False, "error": "request too long"}))
+					break
+				if not line:
+					break
+				if not line.strip():
+					continue
+				writer.write(self.__encode(self.handleRequest(line, client)))
+				await writer.drain()
+		except ConnectionError:
+			pass
+		finally:
+			for game in [game for game, session in self.sessions.items() if session[3] is client]:
+				self.__close(game)
+			writer.close()
+
+	def handleRequest(self, line: bytes, client: object) -> dict:
+		""" Decode and answer a single request """
+		try:
+			request = json.loads(line)
+		except ValueError:
+			return {"ok": False, "error": "invalid JSON"}
+		if not isinstance(request, dict):
+			return {"ok": False, "error": "a request must be an object"}
+		try:
+			op = request.get("op")
+			if op == "new":
+				response = self.__new(request, client)
+			elif op == "act":
+				response = self.__act(request)
+			elif op == "close":
+				response = {"score": self.__close(self.__game(request))}
+			elif op == "status":
+				response = {"sessions": len(self.sessions), "maxSessions": self.maxSessions, "gamesPlayed": self.gamesPlayed}
+			else:
+				raise ValueError("unknown op: {}".format(op))
+			response["ok"] = True
+		except (ValueError, TypeError, KeyError, IndexError, OSError) as e:
+			response = {"ok": False, "error": str(e)}
+		if "id" in request:
+			response["id"] = request["id"]
+		return response
+
+	def __new(self, request: dict, client: object) -> dict:
+		if len(self.sessions) >= self.maxSessions:
+			self.reapIdle()
+			if len(self.sessions) >= self.maxSessions:
+				raise ValueError("too many open games")
+		if "corpus" in request:
+			board = int(request["board"])
+			if board < 0:
+				raise ValueError("invalid board: {}".format(board))
+			definition = openCorpus(request["corpus"])[board]
+		else:
+			difficulty = str(request.get("difficulty", "expert"))
+			parseDifficulty(difficulty)
+			seed = request.get("seed")
+			index = int(request.get("index", 0))
+			if index < 0:
+				raise ValueError("invalid index: {}".format(index))
+			definition = generateWorld(difficulty, random.randrange(1 << 31) if seed is None else int(seed), index)
+		world = World(aiType=None, world=definition)
+
+		game = self.nextGame
+		self.nextGame += 1
+		self.sessions[game] = (world, definition.rowDimension, definition.colDimension, client)
+		self.lastUsed[game] = time.monotonic()
+		return {
+			"game": game,
+			"name": definition.name,
+			"rows": definition.rowDimension,
+			"cols": definition.colDimension,
+			"mines": definition.totalMines,
+			"start": [definition.startX, definition.startY],
+			"percept": world.getPercept(),
+		}
+
+	def __act(self, request: dict) -> dict:
+		game = self.__game(request)
+		world, rowDimension, colDimension, _ = self.sessions[game]
+		# Validate the whole batch first, so the World never has to report a bad action
+		actions = []
+		for move, x, y in request["actions"]:
+			if move not in MOVES:
+				raise ValueError("unknown move: {}".format(move))
+			if not (isinstance(x, int) and isinstance(y, int) and 0 <= x < colDimension and 0 <= y < rowDimension):
+				raise ValueError("out of bounds: {}, {}".format(x, y))
+			actions.append(Action(MOVES[move], x, y))
+
+		self.lastUsed[game] = time.monotonic()
+		percepts, over = world.play(actions)
+		response = {"percepts": percepts, "over": over}
+		if over:
+			response["score"] = self.__close(game)
+			response["outcome"] = world.getGameRecord()["outcome"]
+		return response
+
+	def __game(self, request: dict) -> int:
+		game = request.get("game")
+		if game not in self.sessions:
+			raise ValueError("no such game: {}".format(game))
+		return game
+
+	def __close(self, game: int) -> int:
+		world = self.sessions.pop(game)[0]
+		del self.lastUsed[game]
+		self.gamesPlayed += 1
+		return world.finish()
+
+	def reapIdle(self) -> None:
+		""" Close the games that got no request for idleTimeout seconds """
+		limit = time.monotonic() - self.idleTimeout
+		for game in [game for game, used in self.lastUsed.items() if used < limit]:
+			self.__close(game)
+
+	async def reaper(self) -> None:
+		while True:
+			await asyncio.sleep(max(1, self.idleTimeout / 10))
+			self.reapIdle()
+
+	@staticmethod
+	def __encode(response: dict) -> bytes:
+		return (json.dumps(response) + "\n").encode()
+
+
+async def serveSocket(server: GameServer, path: str) -> None:
+	""" Serve every client connecting to the Unix socket at path, until cancelled """
+	if os.path.exists(path):
+		os.unlink(path)
+	listener = await asyncio.start_unix_server(server.handleClient, path, limit=LINE_LIMIT)
+	reaper = asyncio.ensure_future(server.reaper())
+	try:
+		async with listener:
+			await listener.serve_forever()
+	finally:
+		reaper.cancel()
+		if os.path.exists(path):
+			os.unlink(path)
+
+
+def blockingWriter(out: "binary file object") -> SimpleNamespace:
+	""" Return a stand-in for the StreamWriter of handleClient that writes to out directly """
+	async def drain():
+		out.flush()
+	return SimpleNamespace(write=out.write, drain=drain, close=out.flush)
+
+
+async def serveStdio(server: GameServer) -> None:
+	""" Serve a single client on stdin and stdout, until stdin is closed """
+	""" asyncio can only watch pipes, sockets and terminals, so regular files are read and written directly """
+	loop = asyncio.get_running_loop()
+	reader = asyncio.StreamReader(limit=LINE_LIMIT)
+	try:
+		await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+	except ValueError:
+		reader.feed_data(sys.stdin.buffer.read())
+		reader.feed_eof()
+	try:
+		transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout)
+		writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+	except ValueError:
+		writer = blockingWriter(sys.stdout.buffer)
+	reaper = asyncio.ensure_future(server.reaper())
+	try:
+		await server.handleClient(reader, writer)
+	finally:
+		reaper.cancel()
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Host Minesweeper games for agents in other processes.", prog="GameServer.py")
+	where = parser.add_mutually_exclusive_group(required=True)
+	where.add_argument("--socket", help="path of the Unix socket to listen on")
+	where.add_argument("--stdio", action="store_true", help="serve a single client on stdin/stdout")
+	parser.add_argument("--max-sessions", type=int, default=1024, help="games open at the same time")
+	parser.add_argument("--idle-timeout", type=float, default=300, help="seconds before an idle game is closed")
+	args = parser.parse_args()
+
+	server = GameServer(args.max_sessions, args.idle_timeout)
+	try:
+		if args.stdio:
+			asyncio.run(serveStdio(server))
+		else:
+			asyncio.run(serveSocket(server, args.socket))
+	except KeyboardInterrupt:
+		pass
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,188 @@
+# ==============================CS-199==================================
+# FILE:			GameTrace.py
+#
+# DESCRIPTION:	This file contains the GameTrace class, a compact binary
+#				record of one game: its board and every move made with
+#				the percept it returned. World records one when asked
+#				to, and the replayer below re-applies traces to a World
+#				without any agent, to check that a game still ends the
+#				same way or to look at the board after any move.
+#
+# NOTES: 		- Syntax of the replayer:
+#
+#					python3 GameTrace.py [TraceFile] [Options]
+#
+#					Options:
+#						--failed Only replay the games that were lost.
+#						--show [Name] Print the board of the game named
+#						   Name instead of verifying the traces.
+#						--move [N] With --show, print the board after
+#						   the first N moves instead of all of them.
+#
+#				- All integers are little-endian. A trace file is a
+#				  header, magic "MSGT", version (uint16) and reserved
+#				  (uint16), followed by one record per game:
+#
+#					rows, cols, startX, startY (uint16 each), number of
+#					mines (uint32), length of the name (uint16), score
+#					(uint8), number of moves (uint32), the UTF-8 name,
+#					the mine bitmap described in WorldDefinition.py,
+#					then the moves.
+#
+#				- A move is a byte holding the action in bits 0-1 and
+#				  the percept it returned plus one in bits 2-5 (15 when
+#				  the move ended the game), then x and y as uint8, or
+#				  as uint16 on boards wider or taller than 256 tiles.
+# ==============================CS-199==================================
+
+import sys
+import time
+import struct
+import argparse
+from AI import AI
+from Action import Action
+from WorldDefinition import WorldDefinition
+
+TRACE_MAGIC = b"MSGT"
+TRACE_VERSION = 1
+TRACE_HEADER = struct.Struct("<4sHH")
+TRACE_RECORD = struct.Struct("<HHHHIHBI")
+NARROW_MOVE = struct.Struct("<BBB")
+WIDE_MOVE = struct.Struct("<BHH")
+GAME_OVER = 15
+
+
+class GameTrace():
+
+	def __init__(self, name: str, rowDimension: int, colDimension: int, startX: int, startY: int, totalMines: int, mines: bytes, score: int = 0, moves: bytes = b""):
+		self.name = name
+		self.rowDimension = rowDimension
+		self.colDimension = colDimension
+		self.startX = startX
+		self.startY = startY
+		self.totalMines = totalMines
+		self.mines = bytes(mines)
+		self.score = score
+		self.moves = bytearray(moves)
+		self.__move = WIDE_MOVE if rowDimension > 256 or colDimension > 256 else NARROW_MOVE
+
+	def addMove(self, move: AI.Action, x: int, y: int, percept: int) -> None:
+		""" Append a move, percept being None when the move ended the game """
+		code = GAME_OVER if percept is None else percept + 1
+		self.moves += self.__move.pack(move.value | code << 2, x, y)
+
+	def iterMoves(self) -> "generator of (action, x, y, percept)":
+		for packed, x, y in self.__move.iter_unpack(self.moves):
+			code = packed >> 2
+			yield AI.Action(packed & 3), x, y, None if code == GAME_OVER else code - 1
+
+	def __len__(self):
+		return len(self.moves) // self.__move.size
+
+	def definition(self) -> WorldDefinition:
+		return WorldDefinition(self.name, self.rowDimension, self.colDimension, self.startX, self.startY, self.totalMines, self.mines)
+
+	def encode(self) -> bytes:
+		name = self.name.encode("utf-8")
+		return TRACE_RECORD.pack(self.rowDimension, self.colDimension, self.startX, self.startY,
+			self.totalMines, len(name), self.score, len(self)) + name + self.mines + bytes(self.moves)
+
+	@staticmethod
+	def decode(data: bytes, offset: int = 0) -> tuple:
+		""" Return the trace encoded at offset of data, and the offset of the next one """
+		rows, cols, startX, startY, totalMines, nameLength, score, numMoves = TRACE_RECORD.unpack_from(data, offset)
+		offset += TRACE_RECORD.size
+		name = bytes(data[offset:offset + nameLength]).decode("utf-8")
+		offset += nameLength
+		size = (rows * cols + 7) // 8
+		mines = data[offset:offset + size]
+		offset += size
+		size = numMoves * (WIDE_MOVE if rows > 256 or cols > 256 else NARROW_MOVE).size
+		moves = data[offset:offset + size]
+		return GameTrace(name, rows, cols, startX, startY, totalMines, mines, score, moves), offset + size
+
+	def replay(self, stop: int = None, debug: bool = False) -> tuple:
+		""" Apply the moves to a new World, and return (whether the game went as recorded, """
+		""" a message saying where it did not, the World) """
+		""" With stop, only the first stop moves are applied and the World is left running """
+		from World import World
+		world = World(aiType=None, world=self.definition(), debug=debug)
+		for i, (move, x, y, percept) in enumerate(self.iterMoves()):
+			if i == stop:
+				return True, "", world
+			percepts, over = world.play([Action(move, x, y)])
+			if over != (percept is None):
+				return False, "move {}: the game {} over".format(i + 1, "is" if over else "is not"), world
+			if not over and percepts[0] != percept:
+				return False, "move {}: percept {} instead of {}".format(i + 1, percepts[0], percept), world
+			if over and i + 1 != len(self):
+				return False, "move {}: the game ended before the last move".format(i + 1), world
+		if stop is not None:
+			return True, "", world
+		score = world.finish()
+		if score != self.score:
+			return False, "score {} instead of {}".format(score, self.score), world
+		return True, "", world
+
+
+def openTraceFile(filename: str) -> "file object":
+	""" Create a trace file, ready for encoded traces to be written to it """
+	file = open(filename, "wb")
+	file.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, 0))
+	return file
+
+
+def readTraces(filename: str) -> "generator of GameTrace":
+	with open(filename, "rb") as file:
+		data = memoryview(file.read())
+	magic, version, _ = TRACE_HEADER.unpack_from(data, 0)
+	if magic != TRACE_MAGIC or version != TRACE_VERSION:
+		raise ValueError("Not a trace file: " + filename)
+	offset = TRACE_HEADER.size
+	while offset < len(data):
+		trace, offset = GameTrace.decode(data, offset)
+		yield trace
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Verify or inspect recorded Minesweeper games.", prog="GameTrace.py")
+	parser.add_argument("traces", help="trace file written by Main.py --trace")
+	parser.add_argument("--failed", action="store_true", help="only replay the games that were lost")
+	parser.add_argument("--show", help="print the board of the game with this name")
+	parser.add_argument("--move", type=int, help="with --show, number of moves to apply")
+	args = parser.parse_args()
+
+	try:
+		traces = readTraces(args.traces)
+		if args.show:
+			for trace in traces:
+				if trace.name == args.show:
+					ok, message, world = trace.replay(len(trace) if args.move is None else args.move, debug=True)
+					world.printBoard()
+					if not ok:
+						print("MISMATCH: " + message)
+					return 0 if ok else 1
+			print("ERROR: No game named " + args.show)
+			return 2
+
+		start = time.perf_counter()
+		replayed = 0
+		mismatches = 0
+		for trace in traces:
+			if args.failed and trace.score > 0:
+				continue
+			ok, message, _ = trace.replay()
+			replayed += 1
+			if not ok:
+				mismatches += 1
+				print("MISMATCH {}: {}".format(trace.name, message))
+		elapsed = time.perf_counter() - start
+	except (OSError, ValueError, struct.error) as e:
+		print("ERROR: Could not read the traces: " + str(e))
+		return 2
+	print("{} games replayed in {:.3f}s, {} mismatches".format(replayed, elapsed, mismatches))
+	return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
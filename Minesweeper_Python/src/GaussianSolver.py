@@ -0,0 +1,198 @@
+from typing import Dict, List, Set, Tuple
+
+try:
+	import numpy as np
+	numpy_installed = True
+except ImportError:
+	numpy_installed = False
+
+EPSILON = 1e-9
+
+
+class GaussianSolver:
+	'''
+	Linear deductions over the frontier. Each revealed number is a row of the constraint
+	matrix, each unknown cell next to one is a column, and the row says the cells it touches
+	sum to its mines. The matrix lives in a preallocated NumPy array that follows the
+	constraints of MyAI's ConstraintStore: update only rewrites the rows whose constraint
+	changed, frees the rows and columns that are no longer used and hands them to new numbers,
+	so the matrix is never rebuilt. Which rows and columns meet is also kept in dictionaries,
+	so updates only write to the array and never scan it.
+
+	solve row-reduces the connected components that changed since the previous call. After
+	reduction, a row whose right hand side equals the sum of its positive coefficients forces
+	those cells to be mines and its negative ones to be safe, and the other way around when
+	it equals the sum of its negative coefficients. This is polynomial in the frontier size,
+	and catches deductions that need more than two constraints without any search.
+	'''
+
+	def __init__(self, capacity: int = 64):
+		self.matrix = np.zeros((capacity, capacity), dtype=np.int8)
+		self.rhs = np.zeros(capacity, dtype=np.int16)
+		self.rows : Dict[tuple, int] = {}
+		self.row_owners : Dict[int, tuple] = {}
+		self.columns : Dict[int, int] = {}
+		self.column_cells : Dict[int, int] = {}
+		self.row_columns : Dict[int, Set[int]] = {}
+		self.column_rows : Dict[int, Set[int]] = {}
+		self.free_rows = list(range(capacity - 1, -1, -1))
+		self.free_columns = list(range(capacity - 1, -1, -1))
+		self.synced : Dict[tuple, Tuple[int, int]] = {}
+		self.dirty : Set[int] = set()
+
+	def grow(self, rows: bool):
+		# Double the rows or the columns of the matrix, keeping the used slots where they are
+		height, width = self.matrix.shape
+		if rows:
+			matrix = np.zeros((height * 2, width), dtype=np.int8)
+			self.rhs = np.concatenate([self.rhs, np.zeros(height, dtype=np.int16)])
+			self.free_rows = list(range(height * 2 - 1, height - 1, -1)) + self.free_rows
+		else:
+			matrix = np.zeros((height, width * 2), dtype=np.int8)
+			self.free_columns = list(range(width * 2 - 1, width - 1, -1)) + self.free_columns
+		matrix[:height, :width] = self.matrix
+		self.matrix = matrix
+
+	def update(self, constraints: Dict[tuple, Tuple[int, int]]):
+		'''
+		Brings the matrix up to date with the constraints of a ConstraintStore, rewriting only
+		the rows whose constraint changed since the previous update.
+		'''
+		for owner in [owner for owner in self.synced if owner not in constraints]:
+			self.removeRow(owner)
+		for owner, constraint in constraints.items():
+			if self.synced.get(owner) != constraint:
+				self.setRow(owner, *constraint)
+
+	def setRow(self, owner: tuple, mask: int, mines: int):
+		# Point the row of owner at the cells of mask, claiming a row and columns as needed
+		row = self.rows.get(owner)
+		if row is None:
+			if not self.free_rows:
+				self.grow(True)
+			row = self.free_rows.pop()
+			self.rows[owner] = row
+			self.row_owners[row] = owner
+			self.row_columns[row] = set()
+		self.synced[owner] = (mask, mines)
+		columns = self.row_columns[row]
+		for column in list(columns):
+			if not mask >> self.column_cells[column] & 1:
+				self.releaseCell(row, column)
+		while mask:
+			low = mask & -mask
+			index = low.bit_length() - 1
+			column = self.columns.get(index)
+			if column is None:
+				if not self.free_columns:
+					self.grow(False)
+				column = self.free_columns.pop()
+				self.columns[index] = column
+				self.column_cells[column] = index
+				self.column_rows[column] = set()
+			if column not in columns:
+				self.matrix[row, column] = 1
+				columns.add(column)
+				self.column_rows[column].add(row)
+			mask ^= low
+		self.rhs[row] = mines
+		self.dirty.add(row)
+
+	def removeRow(self, owner: tuple):
+		row = self.rows.pop(owner)
+		del self.row_owners[row]
+		del self.synced[owner]
+		for column in list(self.row_columns[row]):
+			self.releaseCell(row, column)
+		del self.row_columns[row]
+		self.free_rows.append(row)
+		self.dirty.discard(row)
+
+	def releaseCell(self, row: int, column: int):
+		# Clear one entry of the matrix, freeing the column once no row uses it
+		self.matrix[row, column] = 0
+		self.row_columns[row].discard(column)
+		rows = self.column_rows[column]
+		rows.discard(row)
+		if not rows:
+			del self.column_rows[column]
+			del self.columns[self.column_cells.pop(column)]
+			self.free_columns.append(column)
+
+	def components(self) -> List[List[int]]:
+		'''
+		Splits the rows into groups that share no column, with union-find over the rows.
+		'''
+		rows = sorted(self.rows.values())
+		parent = {row: row for row in rows}
+		def find(row):
+			while parent[row] != row:
+				parent[row] = parent[parent[row]]
+				row = parent[row]
+			return row
+
+		for column_rows in self.column_rows.values():
+			first = find(next(iter(column_rows)))
+			for row in column_rows:
+				root = find(row)
+				if root != first:
+					parent[root] = first
+
+		groups : Dict[int, List[int]] = {}
+		for row in rows:
+			groups.setdefault(find(row), []).append(row)
+		return list(groups.values())
+
+	def solve(self) -> Tuple[List[int], List[int]]:
+		'''
+		Returns the bit indices of the cells proven safe and proven mines, from the components
+		with a row that changed since the previous call.
+		'''
+		if not self.dirty:
+			return [], []
+		safe : List[int] = []
+		mines : List[int] = []
+		for group in self.components():
+			if self.dirty.isdisjoint(group):
+				continue
+			columns = np.array(sorted(set().union(*(self.row_columns[row] for row in group))))
+			augmented = np.empty((len(group), len(columns) + 1))
+			augmented[:, :-1] = self.matrix[np.ix_(group, columns)]
+			augmented[:, -1] = self.rhs[group]
+			reduced = self.reduce(augmented)
+			for row in reduced:
+				coefficients, value = row[:-1], row[-1]
+				positive = coefficients > EPSILON
+				negative = coefficients < -EPSILON
+				high = coefficients[positive].sum()
+				low = coefficients[negative].sum()
+				if abs(value - high) < EPSILON:
+					mines.extend(self.column_cells[c] for c in columns[positive].tolist())
+					safe.extend(self.column_cells[c] for c in columns[negative].tolist())
+				elif abs(value - low) < EPSILON:
+					safe.extend(self.column_cells[c] for c in columns[positive].tolist())
+					mines.extend(self.column_cells[c] for c in columns[negative].tolist())
+		self.dirty.clear()
+		return safe, mines
+
+	@staticmethod
+	def reduce(augmented: 'np.ndarray') -> 'np.ndarray':
+		'''
+		Returns the nonzero rows of the reduced row echelon form of the augmented matrix.
+		'''
+		height, width = augmented.shape
+		pivot_row = 0
+		for column in range(width - 1):
+			if pivot_row == height:
+				break
+			pivot = pivot_row + int(np.argmax(np.abs(augmented[pivot_row:, column])))
+			if abs(augmented[pivot, column]) < EPSILON:
+				continue
+			if pivot != pivot_row:
+				augmented[[pivot_row, pivot]] = augmented[[pivot, pivot_row]]
+			augmented[pivot_row] /= augmented[pivot_row, column]
+			factors = augmented[:, column].copy()
+			factors[pivot_row] = 0
+			augmented -= np.outer(factors, augmented[pivot_row])
+			pivot_row += 1
+		return augmented[:pivot_row]
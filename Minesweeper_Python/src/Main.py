@@ -18,25 +18,84 @@
 #						-m Use ManualAI instead of MyAI.
 #						-r Use RandomAI instead of MyAI.
 #						-f [InputPath] [OutputFile]
-#						   First is absolute path to Minesweeper World file or 
-#						   directory containing Minesweeper World files.
+#						   First is absolute path to Minesweeper World file,
+#						   directory containing Minesweeper World files, or
+#						   world corpus created by WorldGenerator.py --pack.
 #						   Second is the file name of the .txt file you wish
 #						   to write your results to.
 #						-v Verbose mode displays the name of the Minesweeper
 #						   World file before running on that world.
 #						-d Debug mode will display the game board after
 #						   every move. Useless when used with -m.
+#						--trace-every [N] Debug mode that displays the
+#						   board every N moves and never pauses. On a
+#						   terminal only the changed tiles are redrawn.
 #						-o Path to output file which results are written to.
+#						-j [Jobs] Number of worker processes used to play
+#						   a directory of Minesweeper World files.
+#						-s [Seed] Seed the random number generator before
+#						   every world, so results are reproducible.
+#						--generate [N] Play N worlds generated in memory
+#						   instead of reading world files.
+#						--difficulty [Difficulty] Difficulty of generated
+#						   worlds: beginner, intermediate, expert (default)
+#						   or ROWSxCOLSxMINES.
+#						--component-cache [File] Snapshot of the cache of
+#						   solved frontier components shared by the MyAI
+#						   games of a run, loaded before and saved after.
+#						--stats [File] Instrument MyAI and write the time
+#						   spent in each of its phases and its counters of
+#						   queue operations, deductions and guesses, per
+#						   world, to a JSON file.
+#						--results [File] Stream one record per world to a
+#						   JSON Lines file, or a CSV file when its name ends
+#						   in .csv, as soon as the world is finished.
+#						--trace [File] Record the moves of every game to
+#						   a trace file, which GameTrace.py replays.
+#						--shard [i/N] Only play worlds i, i+N, i+2N... of
+#						   the sorted worlds of a directory, a corpus or
+#						   --generate, for 0 <= i < N.
+#						--partial [File] Write the counts, the time
+#						   histogram and the per-world records of the run
+#						   to a partial results file.
+#						--cache [Directory] Directory of the result cache
+#						   (default .resultcache, next to this file).
+#						--cache-size [MB] Size the result cache is cut
+#						   down to after every run (default 64).
+#						--no-cache Play every world, without reading or
+#						   writing the result cache.
 #						-h Displays help menu and quits.
 #
+#					Minesweeper merge [PartialFiles] [Options]
+#
+#					Combines the partial results files of the shards of
+#					a run, and prints the summary of the whole run.
+#
+#					Options:
+#						-o [OutputFile] Write the aggregate scores.
+#						--stats [File] Write the agent stats of every world.
+#						--results [File] Write the records of every world.
+#
 #				- The default AI type is MyAI.
 #				
 #				- When using -f, the [OutputFile] should only be used when
-#				  [InputPath] is a folder of world files. If not, then
+#				  [InputPath] is a folder of world files or a corpus. If not, then
 #				  [OutputPath] is useless.
 #
 #				- If both -m and -r are turned on, -r will be turned off.
 #				- -v used without -f is useless.
+#				- -j cannot be used with -m or -d. For a fixed -s, the
+#				  results are identical whatever the number of jobs.
+#				- With -j, the workers start from the loaded component
+#				  cache but their entries are not saved back.
+#				- --shard with --generate needs -s, so that every shard
+#				  generates the same worlds.
+#				- Directories, corpora and --generate use the result
+#				  cache: a world is only played again when its content,
+#				  the source of MyAI or the seed changed. Only runs
+#				  with -s are cached, since an unseeded game is random.
+#				  Runs with -v, -d, --stats or --trace, and other
+#				  agents, are never cached.
 #
 #				- DO NOT MAKE CHANGES TO THIS FILE.
 # ==============================CS-199==================================
@@ -44,21 +103,27 @@
 import sys
 import os
 import argparse
+import random
 from World import World
 from ManualAI import ManualAI
 from RandomAI import RandomAI
 from MyAI import MyAI
-
-import time
-
-try:
-	from tqdm import tqdm
-	tqdm_installed = True
-except ImportError:
-	tqdm_installed = False
+from GaussianSolver import numpy_installed
+from Tournament import listWorlds, listCorpus, runTournament, playWorld, TournamentResults
+from Tournament import parseShard, shardIndices, mergePartials
+from ResultCache import ResultCache
+from ResultsSink import ResultsSink
+from GameTrace import openTraceFile
+from ComponentCache import sharedCache
+from WorldCorpus import WorldCorpus
+from WorldStream import parseDifficulty, generateWorld
 
 def main():
 
+	if len(sys.argv) > 1 and sys.argv[1] == "merge":
+		merge(sys.argv[2:])
+		return
+
 	# Create parser
 	parser = argparse.ArgumentParser(description="", prog="Main.py", usage="%(prog)s [options]", epilog="Note: [options] can be in any order")
 
@@ -68,6 +133,20 @@ def main():
 	parser.add_argument("-r", "-R", help="enable RandomAI mode", action="store_true")			# RandomAI
 	parser.add_argument("-v", "-V", help="enable verbose mode", action="store_true")			# Verbose
 	parser.add_argument("-d", "-D", help="enable debug mode", action="store_true")				# Debug
+	parser.add_argument("--trace-every", help="debug mode printing the board every N moves, without pausing", type=int)	# Trace
+	parser.add_argument("-j", "-J", help="number of worker processes", type=int, default=1)	# Jobs
+	parser.add_argument("-s", "-S", "--seed", help="seed for reproducible runs", type=int)		# Seed
+	parser.add_argument("--generate", help="number of worlds to generate in memory", type=int)	# Generated worlds
+	parser.add_argument("--difficulty", help="difficulty of generated worlds", default="expert")	# Generated difficulty
+	parser.add_argument("--component-cache", help="snapshot file of the solved component cache")	# Component cache
+	parser.add_argument("--stats", help="JSON file the per-world agent stats are written to")	# Agent stats
+	parser.add_argument("--results", help="JSON Lines or CSV file the per-world records are streamed to")	# Results log
+	parser.add_argument("--trace", help="file every game is recorded to, for GameTrace.py")	# Game traces
+	parser.add_argument("--shard", help="only play shard i/N of the worlds")					# Shard
+	parser.add_argument("--partial", help="partial results file to write, for merge")			# Partial results
+	parser.add_argument("--cache", help="directory of the result cache")						# Result cache
+	parser.add_argument("--cache-size", help="size bound of the result cache in MB", type=float, default=64)	# Result cache size
+	parser.add_argument("--no-cache", help="play every world again", action="store_true")		# No result cache
 
 	args = parser.parse_args()
 	
@@ -84,7 +163,8 @@ def main():
 			print("ERROR: -f takes 1 or 2 arguments only!")
 			return
 	verbose = args.v
-	debug = args.d
+	traceEvery = max(0, args.trace_every or 0)
+	debug = args.d or traceEvery > 0
 
 	if args.m:
 		aiType = "manual"
@@ -93,96 +173,92 @@ def main():
 	elif not args.m and not args.r:
 		aiType = "myai"
 
-	if inputFile:
-		# If inputFile is a directory
-		if (os.path.isdir(inputFile)):
-			listOfWorlds = None
+	shard = (0, 1)
+	if args.shard:
+		try:
+			shard = parseShard(args.shard)
+		except ValueError as e:
+			print("ERROR: " + str(e))
+			return
+
+	if args.component_cache:
+		try:
+			sharedCache().load(args.component_cache)
+		except Exception:
+			print("ERROR: Could not read the component cache, starting empty")
+
+	if args.generate:
+		if args.j > 1 and (args.m or debug):
+			print("ERROR: -j cannot be used with -m or -d!")
+			return
+		try:
+			parseDifficulty(args.difficulty)
+		except ValueError as e:
+			print("ERROR: " + str(e))
+			return
+
+		if args.shard and args.seed is None:
+			print("ERROR: --shard needs -s with --generate!")
+			return
+
+		seed = args.seed if args.seed is not None else random.randrange(1 << 31)
+		indices = shardIndices(args.generate, shard)
+		tasks = ((generateWorld(args.difficulty, seed, i), aiType, verbose, debug, args.seed, bool(args.stats), traceEvery, bool(args.trace)) for i in indices)
+		cache = openCache(args)
+		results = runTournament(tasks, args.j, len(indices), openSink(args.results), openTraces(args.trace), cache)
+		closeOutputs(results)
+		results.printSummary()
+		closeCache(cache)
+		if args.partial:
+			results.writePartial(args.partial, shard, indices)
+		saveComponentCache(args.component_cache, args.j)
+		if args.stats:
+			results.writeStats(args.stats)
+
+	elif inputFile:
+		# If inputFile is a directory or a world corpus
+		if (os.path.isdir(inputFile) or WorldCorpus.isCorpus(inputFile)):
+			if args.j > 1 and (args.m or debug):
+				print("ERROR: -j cannot be used with -m or -d!")
+				return
 
 			try:
-				directory = os.walk(inputFile)
+				if os.path.isdir(inputFile):
+					listOfWorlds = listWorlds(inputFile)
+				else:
+					listOfWorlds = listCorpus(inputFile)
 			except:
-				print("ERROR: Failed to open directory")
+				print("ERROR: Failed to open directory or corpus")
 				return
 
-			numScores = 0
-			sumScores = 0
-
-			scoreBeg = 0
-			scoreInt = 0
-			scoreExp = 0
-			times = []
-			for dirpath, _, filenames in directory:
-				if tqdm_installed:
-					for filename in tqdm(filenames):
-						f = os.path.join(dirpath, filename)
-
-						world = World(filename=f, aiType=aiType, verbose=verbose, debug=debug)
-
-						start_time = time.time()
-						score = world.run()
-						if score > 0:
-							times.append(time.time() - start_time)
-						if score == 1:
-							scoreBeg += 1
-						elif score == 2:
-							scoreInt += 1
-						elif score == 3:
-							scoreExp += 1
-
-						numScores += 1
-						sumScores += score
-				else:
-					for filename in filenames:
-						f = os.path.join(dirpath, filename)
-
-						world = World(filename=f, aiType=aiType, verbose=verbose, debug=debug)
-
-						start_time = time.time()
-						score = world.run()
-						if score > 0:
-							times.append(time.time() - start_time)
-						if score == 1:
-							scoreBeg += 1
-						elif score == 2:
-							scoreInt += 1
-						elif score == 3:
-							scoreExp += 1
-
-						numScores += 1
-						sumScores += score
-					
-			print("---------------Your agent's results:---------------")
-			print("Beginner: {} \tIntermediate: {} \tExpert: {}".format(scoreBeg, scoreInt, scoreExp))
-			print("Cumulative Score: " + str(sumScores))
-			total_time = sum(times)
-			sorted_times = [round(x, 3) for x in sorted(times)]
-			if len(times) > 0:
-				print(f"Average Time Per Board: {(total_time / len(times)):.3f}")
-				print(f"Best 5 Times: {sorted_times[:5]}")
-				print(f"Worst 5 Times: {list(reversed(sorted_times[-5:]))}")
-				print(f"Total Time Taken: {total_time:.3f}")
-			else:
-				print("No boards completed")
-			print("--------------------------------------------------")
+			indices = shardIndices(len(listOfWorlds), shard)
+			tasks = [(listOfWorlds[i], aiType, verbose, debug, args.seed, bool(args.stats), traceEvery, bool(args.trace)) for i in indices]
+			cache = openCache(args)
+			results = runTournament(tasks, args.j, sink=openSink(args.results), traceFile=openTraces(args.trace), cache=cache)
+			closeOutputs(results)
+			results.printSummary()
+			closeCache(cache)
+			if args.partial:
+				results.writePartial(args.partial, shard, indices)
+			saveComponentCache(args.component_cache, args.j)
+			if args.stats:
+				results.writeStats(args.stats)
 
 			if outputFile:
 				currDirectory = os.path.dirname(__file__)
 				outputFilePath = os.path.join(currDirectory, outputFile)
 				print(outputFilePath)
-				try:
-					with open(outputFilePath, 'w') as file:
-						file.write("easy: " + str(scoreBeg) + "\n")
-						file.write("medium: " + str(scoreInt) + "\n")
-						file.write("expert: " + str(scoreExp) + "\n")
-						file.write("score: " + str(sumScores))
-				except:
-					print("ERROR: Could not open file for writing!")
+				results.writeOutput(outputFilePath)
 
 		# If inputFile is a world file
 		elif (os.path.isfile(inputFile)):
-			world = World(filename=inputFile, aiType=aiType, verbose=verbose, debug=debug)
-			score = world.run()
-			if score > 0:
+			results = TournamentResults(openSink(args.results), openTraces(args.trace))
+			results.add(*playWorld((inputFile, aiType, verbose, debug, args.seed, bool(args.stats), traceEvery, bool(args.trace))))
+			closeOutputs(results)
+			saveComponentCache(args.component_cache)
+			if args.stats:
+				results.writeStats(args.stats)
+			if results.sumScores > 0:
 				print("WORLD COMPLETE")
 			else:
 				print("WORLD INCOMPLETE")
@@ -192,8 +268,9 @@ def main():
 			print("ERROR: Directory or file does not exist!")
 
 	else:
-		world = World(aiType=aiType, verbose=verbose, debug=debug)
+		world = World(aiType=aiType, verbose=verbose, debug=debug, traceEvery=traceEvery)
 		score = world.run()
+		saveComponentCache(args.component_cache)
 		print("Your AI scored: " + str(score))
 		if score == 0:
 			print("WORLD INCOMPLETE")
@@ -201,5 +278,86 @@ def main():
 			print("WORLD COMPLETE")
 		
 
+def merge(argv: list):
+	parser = argparse.ArgumentParser(description="Combine the partial results files of the shards of a run.", prog="Main.py merge")
+	parser.add_argument("partials", help="partial results files written with --partial", nargs='+')
+	parser.add_argument("-o", "-O", help="file the aggregate scores are written to")
+	parser.add_argument("--stats", help="JSON file the per-world agent stats are written to")
+	parser.add_argument("--results", help="JSON Lines or CSV file the per-world records are written to")
+	args = parser.parse_args(argv)
+
+	try:
+		results, missing = mergePartials(args.partials, openSink(args.results))
+	except (OSError, ValueError, KeyError, TypeError) as e:
+		print("ERROR: Could not merge the partial results: " + str(e))
+		return
+	closeOutputs(results)
+	if missing:
+		print("WARNING: Missing shards: " + ", ".join(str(i) for i in missing))
+	results.printSummary()
+	if args.stats:
+		results.writeStats(args.stats)
+	if args.o:
+		results.writeOutput(args.o)
+
+
+def openSink(filename: str) -> ResultsSink:
+	if not filename:
+		return None
+	try:
+		return ResultsSink(filename)
+	except OSError:
+		print("ERROR: Could not open the results file, records are not written")
+		return None
+
+
+def openTraces(filename: str) -> "file object":
+	if not filename:
+		return None
+	try:
+		return openTraceFile(filename)
+	except OSError:
+		print("ERROR: Could not open the trace file, games are not recorded")
+		return None
+
+
+def closeOutputs(results: TournamentResults):
+	if results.sink:
+		results.sink.close()
+	if results.traceFile:
+		results.traceFile.close()
+
+
+def openCache(args: argparse.Namespace) -> ResultCache:
+	# Unseeded games are random, so one of them must not stand for every later run
+	if args.no_cache or args.seed is None:
+		return None
+	directory = args.cache or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".resultcache")
+	try:
+		return ResultCache(directory, int(args.cache_size * (1 << 20)), {"numpy": numpy_installed})
+	except (OSError, SyntaxError):
+		print("ERROR: Could not fingerprint the agent, results are not cached")
+		return None
+
+
+def closeCache(cache: ResultCache):
+	if cache is None:
+		return
+	cache.evict()
+	print("Result cache: {hits} hits, {misses} misses, {stores} stored, {evictions} evicted, {entries} entries ({bytes} bytes)".format(**cache.stats()))
+
+
+def saveComponentCache(filename: str, jobs: int = 1):
+	# The games of worker processes filled their own copy of the cache, so only save in-process runs
+	if not filename or jobs > 1:
+		return
+	cache = sharedCache()
+	print("Component cache: {entries} entries, {hits} hits, {misses} misses, {evictions} evictions".format(**cache.stats()))
+	try:
+		cache.save(filename)
+	except Exception:
+		print("ERROR: Could not write the component cache!")
+
+
 if __name__ == "__main__":
 	main()
@@ -0,0 +1,79 @@
+from math import comb
+from typing import Dict, List, Tuple
+
+from FrontierSolver import ComponentSolution
+
+
+def _multiply(a: Dict[int, int], b: Dict[int, int]) -> Dict[int, int]:
+	# Product of two polynomials stored as {mine count: number of solutions}
+	product : Dict[int, int] = {}
+	for i, x in a.items():
+		for j, y in b.items():
+			product[i + j] = product.get(i + j, 0) + x * y
+	return product
+
+
+def _ways(n: int, k: int) -> int:
+	return comb(n, k) if 0 <= k <= n else 0
+
+
+class MineProbability:
+	'''
+	Exact mine probabilities for every frontier cell, taking the global mine count into account.
+
+	A component with counts[k] solutions using k mines is the polynomial sum(counts[k] * x^k).
+	Multiplying the polynomials of all components gives the number of frontier solutions for
+	every total K, and each of them is weighted by comb(interior, mines_left - K), the number
+	of ways to place the remaining mines on the unconstrained interior cells. A cell's
+	probability is the weight of the solutions with a mine on it over the total weight.
+
+	Results are memoized by the components, the interior size and the mine count, so asking
+	again about the same position costs a dictionary lookup.
+	'''
+
+	def __init__(self, memo_size: int = 64):
+		self.memo_size = memo_size
+		self.memo : Dict[tuple, Tuple[Dict[tuple, float], float]] = {}
+
+	def probabilities(self, solutions: List[ComponentSolution], interior: int, mines_left: int) -> Tuple[Dict[tuple, float], float]:
+		'''
+		Returns the mine probability of every cell of the given complete components, and the
+		mine probability of any interior cell. Returns None when no solution fits mines_left.
+		'''
+		key = (frozenset(solution.key for solution in solutions), interior, mines_left)
+		if key in self.memo:
+			return self.memo[key]
+
+		# prefix[i] is the product of the first i components, suffix[i] of the components from i on
+		prefix = [{0: 1}]
+		for solution in solutions:
+			prefix.append(_multiply(prefix[-1], solution.counts))
+		suffix = [{0: 1}]
+		for solution in reversed(solutions):
+			suffix.append(_multiply(suffix[-1], solution.counts))
+		suffix.reverse()
+
+		def weight(poly: Dict[int, int], mines: int) -> int:
+			return sum(count * _ways(interior, mines - k) for k, count in poly.items())
+
+		total = weight(prefix[-1], mines_left)
+		if total == 0:
+			return None
+
+		probabilities : Dict[tuple, float] = {}
+		for i, solution in enumerate(solutions):
+			others = _multiply(prefix[i], suffix[i + 1])
+			weights = {k: weight(others, mines_left - k) for k in solution.counts}
+			for j, cell in enumerate(solution.cells):
+				mine_weight = sum(per_cell[j] * weights[k] for k, per_cell in solution.cell_counts.items())
+				probabilities[cell] = mine_weight / total
+
+		interior_probability = 0.0
+		if interior > 0:
+			interior_weight = sum(count * _ways(interior - 1, mines_left - k - 1) for k, count in prefix[-1].items())
+			interior_probability = interior_weight / total
+
+		if len(self.memo) >= self.memo_size:
+			self.memo.clear()
+		self.memo[key] = (probabilities, interior_probability)
+		return probabilities, interior_probability
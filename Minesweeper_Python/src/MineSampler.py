@@ -0,0 +1,100 @@
+import random
+import time
+from typing import Dict, List
+
+from FrontierSolver import ComponentSolution
+
+
+class MineSampler:
+	'''
+	Estimates the solution counts of frontier components too large to enumerate.
+
+	Each sample walks down the same search tree as FrontierSolver, but follows a single
+	random branch: every cell takes a random value among the ones that keep all constraints
+	satisfiable, and the sample weighs 2 for every cell where both values were possible.
+	A path that ends in a solution with k mines adds its weight to counts[k] (and to
+	cell_counts[k] for its mines), a dead end adds nothing. The average weight is an unbiased
+	estimate of the exact count, so the estimated counts plug into MineProbability like the
+	exact ones, up to a common factor that cancels out.
+
+	samples is the number of paths per component, so the estimates only depend on the
+	component and the random module. time_budget optionally caps the seconds spent sampling
+	per call as well, shared among the components left to estimate.
+	'''
+
+	def __init__(self, samples: int = 1000, time_budget: float = None):
+		self.samples = samples
+		self.time_budget = time_budget
+
+	def estimateAll(self, solutions: List[ComponentSolution], mines_left: int):
+		'''
+		Estimates every incomplete component that has not been sampled yet.
+		'''
+		pending = [solution for solution in solutions if not solution.complete and not solution.samples]
+		if self.time_budget is None:
+			for solution in pending:
+				self.estimate(solution, mines_left)
+			return
+		deadline = time.perf_counter() + self.time_budget
+		for i, solution in enumerate(pending):
+			remaining = deadline - time.perf_counter()
+			if remaining <= 0:
+				break
+			self.estimate(solution, mines_left, time.perf_counter() + remaining / (len(pending) - i))
+
+	def estimate(self, solution: ComponentSolution, mines_left: int, deadline: float = None):
+		constraints = list(solution.key)
+		cells = solution.cells
+		n = len(cells)
+		cell_index = {cell: i for i, cell in enumerate(cells)}
+		need = [mines for _, mines in constraints]
+		sizes = [len(constraint_cells) for constraint_cells, _ in constraints]
+		cell_constraints : List[List[int]] = [[] for _ in range(n)]
+		for c, (constraint_cells, _) in enumerate(constraints):
+			for cell in constraint_cells:
+				cell_constraints[cell_index[cell]].append(c)
+
+		counts : Dict[int, int] = {}
+		cell_counts : Dict[int, List[int]] = {}
+		values = [0] * n
+		samples = 0
+		while samples < self.samples and (deadline is None or time.perf_counter() < deadline):
+			samples += 1
+			assigned = [0] * len(constraints)
+			unassigned = sizes[:]
+			weight = 1
+			mines = 0
+			for i in range(n):
+				options = []
+				for value in (0, 1):
+					if value and mines >= mines_left:
+						continue
+					for c in cell_constraints[i]:
+						if assigned[c] + value > need[c] or assigned[c] + value + unassigned[c] - 1 < need[c]:
+							break
+					else:
+						options.append(value)
+				if not options:
+					break
+				if len(options) == 2:
+					weight *= 2
+					value = random.getrandbits(1)
+				else:
+					value = options[0]
+				values[i] = value
+				mines += value
+				for c in cell_constraints[i]:
+					unassigned[c] -= 1
+					assigned[c] += value
+			else:
+				counts[mines] = counts.get(mines, 0) + weight
+				per_cell = cell_counts.get(mines)
+				if per_cell is None:
+					per_cell = cell_counts[mines] = [0] * n
+				for j in range(n):
+					if values[j]:
+						per_cell[j] += weight
+
+		solution.counts = counts
+		solution.cell_counts = cell_counts
+		solution.samples = samples
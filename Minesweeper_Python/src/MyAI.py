@@ -1,25 +1,49 @@
 from AI import AI
 from Action import Action
+from AgentStats import AgentStats, statsEnabled
+from ComponentCache import sharedCache
+from ConstraintStore import ConstraintStore
+from EndgameSolver import EndgameSolver
+from FrontierSolver import FrontierSolver, ComponentSolution, deadlinesEnabled
+from GaussianSolver import GaussianSolver, numpy_installed
+from MineProbability import MineProbability
+from MineSampler import MineSampler
+from PatternTable import loadTable, WINDOW_CELLS, INNER_CELLS, NOT_A_CONSTRAINT
 
 import heapq
+import operator
 import random
-from typing import Dict, List, Tuple, TypeVar, Generic, Any
-import time
-
-import cProfile
-import pstats
-import io
-from pstats import SortKey
-PROFILE = False
-if PROFILE:
-	ob = cProfile.Profile()
-	ob.enable()
+from typing import Callable, Dict, List, Tuple, TypeVar, Generic, Any
 
 UNCOVER = AI.Action.UNCOVER
 FLAG = AI.Action.FLAG
 UNFLAG = AI.Action.UNFLAG
 LEAVE = AI.Action.LEAVE
 
+# Bitboard tables of every board size seen by this process, see boardTables
+_board_tables : Dict[Tuple[int, int], tuple] = {}
+
+def boardTables(rowDimension: int, colDimension: int) -> tuple:
+	'''
+	Returns the positions of a board in bitboard order, the mask of the neighbours of every
+	position, and for every column the bits of the 5-wide window columns that are on the board.
+	They only depend on the size of the board, so they are built once and shared by every MyAI.
+	'''
+	tables = _board_tables.get((rowDimension, colDimension))
+	if tables is None:
+		positions = [(x, y) for y in range(rowDimension) for x in range(colDimension)]
+		# The neighbours of (x, y) in one row, shifted to that row below
+		row_masks = [sum(1 << nx for nx in range(max(0, x - 1), min(colDimension, x + 2))) for x in range(colDimension)]
+		adj_masks = []
+		for x, y in positions:
+			mask = 0
+			for ny in range(max(0, y - 1), min(rowDimension, y + 2)):
+				mask |= row_masks[x] << (ny * colDimension)
+			adj_masks.append(mask & ~(1 << (x + y * colDimension)))
+		window_columns = [sum(1 << (dx + 2) for dx in range(-2, 3) if 0 <= x + dx < colDimension) for x in range(colDimension)]
+		tables = _board_tables[rowDimension, colDimension] = (positions, adj_masks, window_columns)
+	return tables
+
 
 class Cell:
 	def __init__(self, pos: Tuple[int, int], value: int = -1, flagged: bool = False, fully_explored: bool = False):
@@ -33,22 +57,16 @@ class Cell:
 		if self.value > 0 and not self.flagged:
 			self.reduced_value -= 1
 
-	def __lt__(self, other : 'Cell'):
+	def priority(self) -> tuple:
 		# Values less than 0 get popped first
 		# Then the larger values get popped if all > 0
 		# So it would be -2, -1, 4, 3, 2, 1
 		# Step 1: Prioritize negative values over positive values.
-		if self.reduced_value < 0 and other.reduced_value >= 0:
-			return True
-		elif self.reduced_value >= 0 and other.reduced_value < 0:
-			return False
-
-        # Step 2: When both are negative, order ascending (-2 before -1)
-        # or when both are positive, order descending (4 before 3).
+		# Step 2: When both are negative, order ascending (-2 before -1)
+		# or when both are positive, order descending (4 before 3).
 		if self.reduced_value < 0:
-			return self.reduced_value < other.reduced_value
-		else:
-			return self.reduced_value > other.reduced_value
+			return (0, self.reduced_value)
+		return (1, -self.reduced_value)
 
 	def __eq__(self, other : 'Cell'):
 		if isinstance(other, tuple):
@@ -66,58 +84,76 @@ class Cell:
 
 
 T = TypeVar('T')
+REMOVED = object()
 class PriorityQueue(Generic[T]):
+	'''
+	Indexed priority queue on top of heapq. Every entry is a [key, item, ident] list, where
+	the key is the priority tuple of the item followed by an insertion counter, so entries
+	never compare items. self.index maps the identity of an item to its live entry, which
+	makes membership O(1), removal O(1) (the entry is marked as REMOVED and dropped when it
+	reaches the top) and updating a priority O(log n) (the old entry is marked and a new one
+	is pushed). The heap is compacted when removed entries outnumber live ones.
+	'''
 
-	def __init__(self):
-		self.queue = []
-		self.queue2 = []
-		self.entry_table = {}
-	
-	def reset(self):
-		self.queue.extend(self.queue2)
-		self.queue2 = []
-		heapq.heapify(self.queue)
+	def __init__(self, priority: Callable[[T], tuple] = lambda item: (item,), ident: Callable[[T], Any] = lambda item: item):
+		self.priority = priority
+		self.ident = ident
+		self.heap = []
+		self.index = {}
+		self.counter = 0
+		self.removed = 0
 
 	def push(self, item: T):
-		self.remove(item)
-		heapq.heappush(self.queue, item)
-		self.entry_table[item] = True
+		# Pushing an item that is already queued updates its priority
+		ident = self.ident(item)
+		entry = self.index.get(ident)
+		if entry is not None:
+			entry[1] = REMOVED
+			self.removed += 1
+		self.counter += 1
+		entry = [self.priority(item) + (self.counter,), item, ident]
+		self.index[ident] = entry
+		heapq.heappush(self.heap, entry)
+		if self.removed > len(self.index):
+			self._compact()
 
 	def pop(self) -> T:
-		if self.__len__() == 0:
-			return None
-		if len(self.queue) == 0:
-			self.queue, self.queue2 = self.queue2, self.queue
-		value = heapq.heappop(self.queue)
-		heapq.heappush(self.queue2, value)
-		return value
-	
-	def peek(self) -> T:
-		if self.__len__() == 0:
-			return None
-		return self.queue[0]
+		heap = self.heap
+		while heap:
+			entry = heapq.heappop(heap)
+			if entry[1] is not REMOVED:
+				del self.index[entry[2]]
+				return entry[1]
+			self.removed -= 1
+		return None
 
 	def remove(self, item: T):
-		if item in self.entry_table:
-			del self.entry_table[item]
-			if item in self.queue:
-				self.queue.remove(item)
-				heapq.heapify(self.queue)
-			elif item in self.queue2:
-				self.queue2.remove(item)
-				heapq.heapify(self.queue2)
+		ident = self.ident(item)
+		entry = self.index.pop(ident, None)
+		if entry is not None:
+			entry[1] = REMOVED
+			self.removed += 1
+
+	def _compact(self):
+		self.heap = [entry for entry in self.heap if entry[1] is not REMOVED]
+		heapq.heapify(self.heap)
+		self.removed = 0
 
 	def __len__(self):
-		return len(self.queue)
+		return len(self.index)
+
+	def __iter__(self):
+		for entry in self.index.values():
+			yield entry[1]
 
 	def __repr__(self):
-		return str(self.queue) + str(self.queue2)
+		return str([entry[1] for entry in self.heap if entry[1] is not REMOVED])
 
 	def __str__(self):
 		return self.__repr__()
 	
 	def __contains__(self, item: T):
-		return item in self.entry_table
+		return self.ident(item) in self.index
 
 class MyAI( AI ):
 
@@ -125,11 +161,80 @@ class MyAI( AI ):
 		self.grid_dim = (rowDimension, colDimension)
 		self.totalMines = totalMines
 		self.explored_cells : Dict[tuple, Cell] = {}
-		self.priority_queue = PriorityQueue[Cell]()
+		# Dirty worklists: numbered cells whose surroundings changed since baseCase / handlePatterns last saw them
+		self.priority_queue = PriorityQueue[Cell](Cell.priority, operator.attrgetter('pos'))
+		self.pattern_queue = PriorityQueue[Cell](Cell.priority, operator.attrgetter('pos'))
+		# Deduced actions waiting to be played, by position
+		self.ready : Dict[tuple, AI.Action] = {}
+		# Constraints of the numbered cells that still have unexplored neighbours
+		self.store = ConstraintStore()
+		# The same constraints as a matrix for row reduction, when NumPy is available
+		self.linear = GaussianSolver() if numpy_installed else None
+		# Wall-clock caps make the game depend on the load of the machine, see enableDeadlines
+		self.solver = FrontierSolver(cache=sharedCache(), time_budget=0.05 if deadlinesEnabled() else None)
+		self.solutions : List[ComponentSolution] = []
+		self.probability = MineProbability()
+		self.sampler = MineSampler(time_budget=0.05 if deadlinesEnabled() else None)
+		self.endgame = EndgameSolver()
 		self.pos = (startX, startY)
 
 		self.flags = 0
 		self._adj_cells = {}
+		self._near_cells = {}
+		# Bitboards over the flat index x + y * colDimension: one bit per cell in each set,
+		# and the mask of the neighbours of every cell, so neighbourhood queries are ANDs.
+		# These tables are shared with the other agents on boards of the same size, so never change them.
+		self.positions, self.adj_masks, self.window_columns = boardTables(rowDimension, colDimension)
+		self.unknown = (1 << len(self.positions)) - 1
+		# Precomputed deductions for the 5x5 window around a cell
+		self.patterns = loadTable()
+		self.flagged = 0
+		self.revealed = 0
+		# Positions of the actions whose percepts have not been processed yet
+		self.batch = [self.pos]
+		# The number of guesses, and whether the last batch was one
+		self.guesses = 0
+		self.guessed = False
+		# Per-phase timers and counters, only when instrumentation is turned on
+		self.stats = AgentStats() if statsEnabled() else None
+		if self.stats:
+			self.instrument()
+
+	def instrument(self):
+		'''
+		Replaces the phases and queue operations of this agent with timed and counted versions,
+		so an agent without stats pays nothing for them. The guesses that were survived are
+		counted when the next batch is asked for, so a game lost on a guess has one more guess
+		than guesses survived.
+		'''
+		stats = self.stats
+		for phase in ("respondToPreviousAction", "baseCase", "handlePatterns", "handleLinear",
+				"handleEndgame", "handleSolver", "handleGuess"):
+			setattr(self, phase, stats.timed(phase, getattr(self, phase)))
+		for name in ("priority_queue", "pattern_queue"):
+			queue = getattr(self, name)
+			queue.push = stats.counted(name + ".push", queue.push)
+			queue.pop = stats.counted(name + ".pop", queue.pop)
+		self.nextReady = stats.counted("deductions", self.nextReady, results=True)
+		stats.count("guesses_survived", 0)
+
+		get_actions = stats.timed("getActions", self.getActions)
+		def getActions(percepts: list) -> List[Action]:
+			if self.guessed:
+				stats.count("guesses_survived")
+				self.guessed = False
+			return get_actions(percepts)
+		self.getActions = getActions
+
+	def getStats(self) -> dict:
+		if not self.stats:
+			return None
+		stats = self.stats.toDict()
+		stats["counters"]["guesses"] = self.guesses
+		return stats
+
+	def getGuesses(self) -> int:
+		return self.guesses
 		
 	def getAdjCells(self, pos: tuple) -> list:
 		'''
@@ -149,99 +254,180 @@ class MyAI( AI ):
 		self._adj_cells[pos] = adj_cells
 		return adj_cells
 		
+	def getNearCells(self, pos: tuple) -> list:
+		'''
+		Returns a list of the cells at most two steps away from the given position, itself included.
+		These are the cells whose patterns can change when the given position changes.
+		'''
+		if pos in self._near_cells:
+			return self._near_cells[pos]
+		row, col = pos
+		near_cells = []
+		for i in range(-2, 3):
+			for j in range(-2, 3):
+				if 0 <= row + i < self.grid_dim[1] and 0 <= col + j < self.grid_dim[0]:
+					near_cells.append((row + i, col + j))
+		self._near_cells[pos] = near_cells
+		return near_cells
+
+	def index(self, pos: tuple) -> int:
+		'''
+		Returns the bit of the given position in the bitboards.
+		'''
+		return pos[0] + pos[1] * self.grid_dim[1]
+
+	def cellsOf(self, mask: int) -> list:
+		'''
+		Returns the positions of the bits set in the given mask, lowest index first.
+		'''
+		cells = []
+		while mask:
+			low = mask & -mask
+			cells.append(self.positions[low.bit_length() - 1])
+			mask ^= low
+		return cells
+
+	def getAdjUnexploredMask(self, pos: tuple) -> int:
+		'''
+		Returns the bitboard of the adjacent unexplored cells to the given position.
+		'''
+		return self.adj_masks[pos[0] + pos[1] * self.grid_dim[1]] & self.unknown
+
 	def getAdjUnexplored(self, pos: tuple) -> list:
 		'''
 		Returns a list of adjacent unexplored cells to the given position.
 		The cells are 0-indexed.
 		'''
-		cells = self.getAdjCells(pos)
-		unexplored = []
-		for cell in cells:
-			if cell not in self.explored_cells:
-				unexplored.append(cell)
-		return unexplored
+		return self.cellsOf(self.adj_masks[pos[0] + pos[1] * self.grid_dim[1]] & self.unknown)
 	
 	def getAdjExplored(self, pos: tuple) -> list:
 		'''
 		Returns a list of adjacent explored cells to the given position.
 		The cells are 0-indexed.
 		'''
-		cells = self.getAdjCells(pos)
-		explored = []
-		for cell in cells:
-			if cell in self.explored_cells:
-				explored.append(cell)
-		return explored
+		return self.cellsOf(self.adj_masks[pos[0] + pos[1] * self.grid_dim[1]] & ~self.unknown)
 	
 	def getAdjFlagged(self, pos: tuple) -> list:
 		'''
 		Returns a list of adjacent flagged cells to the given position.
 		The cells are 0-indexed.
 		'''
-		cells = self.getAdjCells(pos)
-		flagged = []
-		for cell in cells:
-			if cell in self.explored_cells:
-				if self.explored_cells[cell].flagged:
-					flagged.append(cell)
-		return flagged
+		return self.cellsOf(self.adj_masks[pos[0] + pos[1] * self.grid_dim[1]] & self.flagged)
+
+	def windowShape(self, pos: tuple) -> int:
+		'''
+		Returns the unknown cells of the 5x5 window around the given position, as PatternTable bits.
+		'''
+		x, y = pos
+		cols = self.grid_dim[1]
+		shape = 0
+		for dy in range(-2, 3):
+			if 0 <= y + dy < self.grid_dim[0]:
+				start = (y + dy) * cols + x - 2
+				bits = self.unknown >> start if start >= 0 else self.unknown << -start
+				shape |= (bits & self.window_columns[x]) << ((dy + 2) * 5)
+		return shape
+
+	def windowKey(self, pos: tuple, shape: int) -> int:
+		'''
+		Returns the PatternTable key of the 5x5 window around the given position: its shape,
+		and the reduced values of the revealed numbers next to the position.
+		'''
+		x, y = pos
+		key = shape
+		shift = 25
+		for dx, dy in INNER_CELLS:
+			cell = self.explored_cells.get((x + dx, y + dy))
+			if cell is None or cell.flagged or not 0 <= cell.reduced_value <= 8:
+				key |= NOT_A_CONSTRAINT << shift
+			else:
+				key |= cell.reduced_value << shift
+			shift += 4
+		return key
+
+	def windowCells(self, pos: tuple, mask: int) -> list:
+		'''
+		Returns the positions of the cells of a window mask around the given position.
+		'''
+		cells = []
+		while mask:
+			low = mask & -mask
+			dx, dy = WINDOW_CELLS[low.bit_length() - 1]
+			cells.append((pos[0] + dx, pos[1] + dy))
+			mask ^= low
+		return cells
+
+	def explore(self, cell: Cell):
+		# Record an explored or flagged cell in the dictionary and the bitboards.
+		self.explored_cells[cell.pos] = cell
+		index = self.index(cell.pos)
+		bit = 1 << index
+		self.store.explore(index, cell.flagged)
+		self.unknown &= ~bit
+		if cell.flagged:
+			self.flagged |= bit
+		else:
+			self.revealed |= bit
 	
-	def respondToAction(self, cell : Cell):
-		# If the cell value is -2 it needs to be flagged
-		if cell.value == -2:
-			self.pos = cell.pos
-			return Action(FLAG, cell.pos[0], cell.pos[1])
-		# If the cell value is -1 it needs to be explored
-		if cell.value == -1:
-			self.pos = cell.pos
-			return Action(UNCOVER, cell.pos[0], cell.pos[1])
-		# If the cell is fully explored, we can remove it from the queue
-		if cell.fully_explored:
-			self.priority_queue.remove(cell)
-			return 'continue'
+	def markDirty(self, pos : tuple):
+		# The cell at pos changed, so the numbered cells next to it need baseCase again
+		# and the numbered cells up to two steps away need handlePatterns again.
+		for near in self.getNearCells(pos):
+			cell = self.explored_cells.get(near)
+			if cell is None or cell.flagged or cell.fully_explored:
+				continue
+			self.pattern_queue.push(cell)
+			if abs(near[0] - pos[0]) <= 1 and abs(near[1] - pos[1]) <= 1:
+				self.priority_queue.push(cell)
+
+	def nextReady(self) -> Action:
+		# Play the oldest deduced action whose cell is still unexplored.
+		while self.ready:
+			pos = next(iter(self.ready))
+			move = self.ready.pop(pos)
+			if pos not in self.explored_cells:
+				self.pos = pos
+				return Action(move, pos[0], pos[1])
+		return None
 
 	def respondToPreviousAction(self, number : int):
+		self.ready.pop(self.pos, None)
 		if number == 0:
 			# This means we just uncovered a completely safe cell.
-			self.priority_queue.remove(Cell(self.pos))
-			self.explored_cells[self.pos] = Cell(self.pos, number, False, True)
+			self.explore(Cell(self.pos, number, False, True))
 			adj_cells = self.getAdjUnexplored(self.pos)
 			for cell in adj_cells:
-				if cell not in self.priority_queue:
-					self.priority_queue.push(Cell(cell))
+				self.ready.setdefault(cell, UNCOVER)
 		elif number == -1:
 			# This means we just flagged the previous cell.
-			self.priority_queue.remove(Cell(self.pos))
-			self.explored_cells[self.pos] = Cell(self.pos, -2, True, False)
+			self.explore(Cell(self.pos, -2, True, False))
 			self.flags += 1
 			# We can now reduce the value of all adjacent cells by 1
 			adj_cells = self.getAdjExplored(self.pos)
 			for cell in adj_cells:
 				self.explored_cells[cell].update_rd()
-				cell = self.explored_cells[cell]
-				if cell in self.priority_queue:
-					self.priority_queue.push(cell)
 		else:
 			# This means we just uncovered a cell with a number.
 			temp_cell = Cell(self.pos, number, False, False)
-			adj_cells = self.getAdjUnexplored(self.pos)
-			if len(adj_cells) == 0:
+			adj_mask = self.adj_masks[self.index(self.pos)]
+			if not adj_mask & self.unknown:
 				temp_cell.fully_explored = True
 			# We can now check for flags around the cell and reduce the value as needed
-			temp_cell.reduced_value = number - len(self.getAdjFlagged(self.pos))
-			self.explored_cells[self.pos] = temp_cell
-			self.priority_queue.push(temp_cell)
-
-	def travelQueue(self, func):
-		# A helper function to go through the priority queue and apply the given function.
-		while len(self.priority_queue) > 0:
-			cell = self.priority_queue.pop()
-			action = self.respondToAction(cell)
-			if action == 'continue':
+			temp_cell.reduced_value = number - (adj_mask & self.flagged).bit_count()
+			self.explore(temp_cell)
+			if not temp_cell.fully_explored:
+				self.store.add(self.pos, adj_mask & self.unknown, temp_cell.reduced_value)
+		self.markDirty(self.pos)
+
+	def travelQueue(self, queue : PriorityQueue, func):
+		# A helper function to go through a dirty worklist and apply the given function,
+		# until one of the cells produces a ready action.
+		while not self.ready and len(queue) > 0:
+			cell = queue.pop()
+			if cell.fully_explored:
 				continue
-			elif action:
-				return action
 			func(cell)
+		return self.nextReady()
 
 	def baseCase(self):
 		# Now go through the priority queue and check if we can flag or uncover any cells.
@@ -250,74 +436,145 @@ class MyAI( AI ):
 			# If we are here then this is a cell with a number
 			# If a cell is explored and unexplored cells are equal to the number 
 			# of mines, flag all unexplored cells
-			adj_cells = self.getAdjUnexplored(cell.pos)
-			adj_size = len(adj_cells)
-			if cell.reduced_value == adj_size and adj_size > 0:
-				for adj_cell in adj_cells:
-					self.priority_queue.push(Cell(adj_cell, -2))
+			adj_mask = self.getAdjUnexploredMask(cell.pos)
+			if not adj_mask:
+				cell.fully_explored = True
+				return
+			if cell.reduced_value == adj_mask.bit_count():
+				for adj_cell in self.cellsOf(adj_mask):
+					self.ready.setdefault(adj_cell, FLAG)
 			# If a cell is explored and the number of flags adjacent to the cell is equal 
 			# to the number of mines, uncover all unexplored cells
 			if cell.reduced_value == 0:
-				for adj_cell in adj_cells:
-					self.priority_queue.push(Cell(adj_cell))
+				for adj_cell in self.cellsOf(adj_mask):
+					self.ready.setdefault(adj_cell, UNCOVER)
 
-		return self.travelQueue(_basecase)
+		return self.travelQueue(self.priority_queue, _basecase)
 	
 	def handlePatterns(self):
-		# Now go through the priority queue and check if we can apply any patterns.
-		# This is the more complex case where we have to apply patterns.
+		# Now go through the priority queue and look up the window around each cell in the
+		# pattern table. Otherwise compare the cell's constraint with every constraint it
+		# overlaps. This covers the 1-1, 1-2, hole and T patterns and more.
 		def _handlepatterns(cell : Cell):
-			# 1-1, 1-1R
-			for i in range(2, 5):
-				result = self.generalPattern(cell, i, 1)
-				if result:
-					for pos in result:
-						self.priority_queue.push(Cell(pos))
-					return
-			result = self.generalPattern(cell, 3, 2)
-			if result:
-				for pos in result:
-					self.priority_queue.push(Cell(pos))
-				return
-			result = self.holeThreePattern(cell)
-			if result:
-				for pos in result:
-					self.priority_queue.push(Cell(pos))
-				return
-			result = self.oneTwoCPattern(cell)
-			if result:
-				for pos in result:
-					self.priority_queue.push(Cell(pos, -2))
-				return
-			result = self.oneTwoCPlusPattern(cell)
-			if result:
-				for pos in result:
-					self.priority_queue.push(Cell(pos, -2))
+			shape = self.windowShape(cell.pos)
+			found = self.patterns.lookup(self.windowKey(cell.pos, shape)) if shape in self.patterns.shapes else None
+			if found:
+				safe, mines = found
+				for pos in self.windowCells(cell.pos, safe):
+					self.ready.setdefault(pos, UNCOVER)
+				for pos in self.windowCells(cell.pos, mines):
+					self.ready.setdefault(pos, FLAG)
 				return
+			safe, mines = self.store.deduce(cell.pos)
+			for pos in self.cellsOf(safe):
+				self.ready.setdefault(pos, UNCOVER)
+			for pos in self.cellsOf(mines):
+				self.ready.setdefault(pos, FLAG)
 
-		return self.travelQueue(_handlepatterns)
+		return self.travelQueue(self.pattern_queue, _handlepatterns)
 	
+	def frontierConstraints(self) -> list:
+		# One constraint per frontier cell: its unexplored neighbours hold exactly reduced_value mines.
+		return [(tuple(self.cellsOf(mask)), mines) for mask, mines in self.store.constraints.values()]
+
+	def handleLinear(self):
+		# Patterns ran out, so row-reduce the frontier components that changed and play
+		# every cell forced by a reduced row, before falling back to the exponential search.
+		if not self.linear:
+			return None
+		self.linear.update(self.store.constraints)
+		safe, mines = self.linear.solve()
+		for index in safe:
+			self.ready.setdefault(self.positions[index], UNCOVER)
+		for index in mines:
+			self.ready.setdefault(self.positions[index], FLAG)
+		return self.nextReady()
+
+	def handleEndgame(self):
+		# Few cells are left, so enumerate all of them with the exact number of mines left.
+		# Play every cell that is safe or a mine in all assignments, or else the safest guess.
+		unknown = self.unknown
+		if not unknown or unknown.bit_count() > self.endgame.max_cells:
+			return None
+		cells = []
+		while unknown:
+			low = unknown & -unknown
+			cells.append(low.bit_length() - 1)
+			unknown ^= low
+		probabilities = self.endgame.solve(cells, list(self.store.constraints.values()), self.totalMines - self.flags)
+		if probabilities is None:
+			return None
+		for index, probability in zip(cells, probabilities):
+			if probability == 0:
+				self.ready.setdefault(self.positions[index], UNCOVER)
+			elif probability == 1:
+				self.ready.setdefault(self.positions[index], FLAG)
+		action = self.nextReady()
+		if action: return action
+		return self.guess(self.positions[cells[min(range(len(cells)), key=probabilities.__getitem__)]])
+
+	def handleSolver(self):
+		# Patterns ran out, so solve the whole frontier exactly and play every forced cell.
+		self.solutions = self.solver.solve(self.frontierConstraints())
+		for solution in self.solutions:
+			safe, mines = solution.forced()
+			for pos in safe:
+				self.ready.setdefault(pos, UNCOVER)
+			for pos in mines:
+				self.ready.setdefault(pos, FLAG)
+		return self.nextReady()
+
+	def safestCell(self) -> tuple:
+		'''
+		Returns the unexplored cell least likely to be a mine, from the exact probabilities
+		of the solved frontier and the number of mines left. Components the solver could not
+		finish are sampled instead, and the cells of those that got no estimate (when the
+		sampler ran out of time) are counted as interior cells. Returns None if the probabilities
+		cannot be computed.
+		'''
+		mines_left = self.totalMines - self.flags
+		self.sampler.estimateAll(self.solutions, mines_left)
+		known = [solution for solution in self.solutions if solution.counts]
+		constrained = 0
+		for solution in known:
+			for cell in solution.cells:
+				constrained |= 1 << self.index(cell)
+		interior = self.cellsOf(self.unknown & ~constrained)
+		result = self.probability.probabilities(known, len(interior), mines_left)
+		if result is None:
+			return None
+		probabilities, interior_probability = result
+		best = min(probabilities, key=probabilities.get) if probabilities else None
+		if interior and (best is None or interior_probability < probabilities[best]):
+			# Every interior cell is as likely to be a mine, so take one with the fewest neighbours,
+			# which is the most likely to open up an area.
+			fewest = min(len(self.getAdjCells(pos)) for pos in interior)
+			best = random.choice([pos for pos in interior if len(self.getAdjCells(pos)) == fewest])
+		return best
+
 	def handleGuess(self, debug=False):
 		# If we are here, then we are in a unlucky situation where we have to guess.
-		# Pick the lowest number cell with unexplored values and uncover one if its adjacent cells.
+		# Uncover the cell least likely to be a mine, or if that cannot be computed,
+		# pick the lowest number cell with unexplored values and uncover one if its adjacent cells.
 		if not debug:
-			local : List[Cell] = list(self.priority_queue.queue)
+			choice = self.safestCell()
+			if choice is not None:
+				return self.guess(choice)
+			local : List[Cell] = [self.explored_cells[pos] for pos in self.store.constraints]
 			local = sorted(local, key=lambda x: x.reduced_value)
 			for cell in local:
 				if len(self.getAdjUnexplored(cell.pos)) > 0:
 					adj = self.getAdjUnexplored(cell.pos)
-					choice = random.choice(adj)
-					self.pos = choice
-					return Action(UNCOVER, choice[0], choice[1])
-		if PROFILE:		
-			ob.disable()
-			sec = io.StringIO()
-			sortby = SortKey.CUMULATIVE
-			ps = pstats.Stats(ob, stream=sec).sort_stats(sortby)
-			ps.print_stats()
-			print(sec.getvalue())
+					return self.guess(random.choice(adj))
 		return Action(LEAVE)
 
+	def guess(self, pos: tuple) -> Action:
+		# Uncover a cell that is not known to be safe. Played on its own, see getActions.
+		self.pos = pos
+		self.guesses += 1
+		self.guessed = True
+		return Action(UNCOVER, pos[0], pos[1])
+
 	def getAction(self, number: int) -> Action:
 		'''
 		This function is called repeatedly until the game ends.
@@ -353,187 +610,56 @@ class MyAI( AI ):
 
 		This requires:
 			 - A dictionary with all explored cells (position, value, flagged, fully explored)
-			 - A rotating priority queue by value for explored cells to check
-			 	- This is two priority queues, when moving through we pop to the other queue.
+			 - Two dirty worklists of numbered cells, in Cell.priority order: priority_queue
+			   for the base case and pattern_queue for the patterns. A cell is popped when it
+			   is checked, and markDirty only pushes it back when a cell next to it (or up to
+			   two steps away, for the patterns) changes.
+			 - A dictionary of the deduced actions that are ready to be played, by position.
 
 		'''
 		self.respondToPreviousAction(number)
-		self.priority_queue.reset()
+		return self.chooseAction()
+
+	def getActions(self, percepts: list) -> List[Action]:
+		'''
+		Batched version of getAction. The percepts are the numbers returned for each action of
+		the previous batch, in order. The first action is chosen exactly like getAction does,
+		then every other cell that is already known to be safe or a mine is added to the batch.
+		A guess is always played on its own.
+		'''
+		for pos, number in zip(self.batch, percepts):
+			self.pos = pos
+			self.respondToPreviousAction(number)
+
+		action = self.chooseAction()
+		actions = [action]
+		while self.ready:
+			action = self.nextReady()
+			if action:
+				actions.append(action)
+		self.batch = [(a.getX(), a.getY()) for a in actions]
+		return actions
+
+	def chooseAction(self) -> Action:
+		# Play the actions that are already deduced first, then look for new deductions
+		# around the dirty cells, and only guess when none of the stages finds an action.
+		action = self.nextReady()
+		if action: return action
 
 		action = self.baseCase()
 		if action: return action
-		self.priority_queue.reset()
 		
 		action = self.handlePatterns()
 		if action: return action
-		self.priority_queue.reset()
-
-		return self.handleGuess()
-
-	'''
-	PATTERNS
-	'''
-	
-	def generalPattern(self, cell : Cell, amount, reduction) -> bool | list[tuple]:
-		'''
-		If the given position follows a 1-1 / 1-1R / 1-1+ / H1 / H2 / T1 / T2 / T3/ T5 pattern, return a list of the positions cells that can be uncovered. 
-		Otherwise, return False.
-		'''
-		# The left one is touching 2 cells. the right one is also touching those two cells. therefore we can open the third cell
-		# . . . <- open this cell
-		# 1 1 
-
-		def checkOne(cell : Cell):
-			return cell.reduced_value == reduction and not cell.flagged
-		
-		pos = cell.pos
-		#cell value needs to be a one or needs to reduce to one
-		if not checkOne(cell):
-			return False		
-		#there has to be 2 unexplored cells in this pattern
-		if len(self.getAdjUnexplored(pos)) != amount:
-			return False
-		
-		adjcells = self.getAdjCells(pos) 
-		total = []
-		for cell in adjcells:
-			#find a cell with value one 
-			if cell in self.explored_cells and checkOne(self.explored_cells[cell]): 
-				targetUnxAdjCells = self.getAdjUnexplored(cell)
-				ogUnxAdjCells = self.getAdjUnexplored(pos)
-
-				#they need to share x cells
-				if len(set(targetUnxAdjCells).intersection(set(ogUnxAdjCells))) != amount:
-					continue
-
-				for target in targetUnxAdjCells:
-					if target not in ogUnxAdjCells:
-						total.append(target)
-		return total
-
-	def holeThreePattern(self, cell : Cell):
-
-		def checkOne(cell : Cell):
-			return cell.reduced_value == 1 and not cell.flagged
-		
-		pos = cell.pos
-		#cell value needs to be a one or needs to reduce to one
-		if not checkOne(cell):
-			return False		
-		
-		ogUnxAdjCells = self.getAdjUnexplored(pos)
-
-		#there has to be 2 unexplored cells in this pattern
-		if len(ogUnxAdjCells) != 2:
-			return False
-		
-		total = []
-
-		for unx in ogUnxAdjCells:
-			adjcells = self.getAdjCells(unx) 
 
-			for c in adjcells:
-				if c in self.explored_cells and checkOne(self.explored_cells[c]):
+		action = self.handleLinear()
+		if action: return action
 
-					targetUnxAdjCells = self.getAdjUnexplored(c)
+		action = self.handleEndgame()
+		if action: return action
 
-					if len(set(targetUnxAdjCells).intersection(set(ogUnxAdjCells))) != 2:
-						continue
+		action = self.handleSolver()
+		if action: return action
 
-					for target in targetUnxAdjCells:
-						if target not in ogUnxAdjCells:
-							total.append(target)
-		return set(total)
+		return self.handleGuess()
 
-	def oneTwoCPattern(self, cell: Cell):
-		"""
-		Implements the 1-2C pattern. If applicable, return the position of the flagged cell.
-		Otherwise, return False.
-		
-		Logic:
-		1. The given cell must have a reduced value of 1 (and not be flagged).
-		2. Find a neighboring cell with a reduced value of 2 (and not flagged).
-		3. Identify shared unexplored cells between the 1 and the 2.
-		4. If shared cells are fewer than or equal to the number allowed by the 1, proceed.
-		5. Deduce the remaining unexplored cell(s) adjacent to the 2 as potential mines.
-		"""
-		# The cell must be a 1 and not flagged
-		if cell.reduced_value != 1 or cell.flagged:
-			return False
-
-		# Check adjacent cells for a "2"
-		for neighbor_pos in self.getAdjCells(cell.pos):
-			if neighbor_pos in self.explored_cells:
-				neighbor = self.explored_cells[neighbor_pos]
-				
-				# Look for a neighboring cell with reduced value 2
-				if neighbor.reduced_value == 2 and not neighbor.flagged:
-					# Find shared unexplored cells
-					shared_unexplored = [
-						c for c in self.getAdjUnexplored(cell.pos)
-						if c in self.getAdjUnexplored(neighbor_pos)
-					]
-					
-					# Verify shared unexplored cells
-					if len(shared_unexplored) == 2:
-						# Remaining unexplored cells adjacent to the "2"
-						third_cells = [
-							c for c in self.getAdjUnexplored(neighbor_pos)
-							if c not in shared_unexplored
-						]
-						
-						# If exactly one cell remains, it must be a mine
-						if len(third_cells) == 1:
-							return [third_cells[0]]  # Return as a list
-		
-		return False
-	
-	def oneTwoCPlusPattern(self, cell: Cell):
-		"""
-		Implements the 1-2C+ pattern.
-		If applicable, return a list of positions for cells to be flagged.
-		Otherwise, return False.
-		
-		Logic:
-		1. The given cell must have a reduced value of 1 (and not be flagged).
-		2. Find a neighboring cell with a reduced value >= 3 (and not flagged).
-		3. Identify shared unexplored cells between the 1 and the N.
-		4. If shared cells are exactly 2, proceed.
-		5. Deduce the remaining unexplored cells adjacent to the N as mines if they match the required mine count.
-		"""
-		# The cell must be a 1 and not flagged
-		if cell.reduced_value != 1 or cell.flagged:
-			return False
-
-		# Iterate through all adjacent cells to find a neighbor with reduced_value >= 3
-		for neighbor_pos in self.getAdjCells(cell.pos):
-			if neighbor_pos in self.explored_cells:
-				neighbor = self.explored_cells[neighbor_pos]
-
-				# Look for a neighboring cell with reduced value >= 3 and not flagged
-				if neighbor.reduced_value >= 3 and not neighbor.flagged:
-					# Find shared unexplored cells between the 1 and the neighbor
-					shared_unexplored = [
-						c for c in self.getAdjUnexplored(cell.pos)
-						if c in self.getAdjUnexplored(neighbor_pos)
-					]
-
-					# Ensure there are exactly 2 shared unexplored cells
-					if len(shared_unexplored) != 2:
-						continue
-
-					# Remaining unexplored cells adjacent only to the neighbor
-					remaining_cells = [
-						c for c in self.getAdjUnexplored(neighbor_pos)
-						if c not in shared_unexplored
-					]
-
-					# Calculate remaining mines required in the remaining_cells
-					# Since Cell A (1) can have at most 1 mine in shared_unexplored
-					remaining_mines = neighbor.reduced_value - 1
-
-					# If the number of remaining cells matches the remaining mines, flag them
-					if len(remaining_cells) == remaining_mines and remaining_mines > 0:
-						return remaining_cells  # Already a list
-		
-		return False
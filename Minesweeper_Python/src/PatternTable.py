@@ -0,0 +1,218 @@
+import os
+import struct
+import argparse
+from typing import Dict, List, Set, Tuple
+
+from FrontierSolver import FrontierSolver
+
+# The window is the 5x5 square around a revealed cell. Window cell w = (dy + 2) * 5 + (dx + 2),
+# and the 9 inner cells, whose neighbours all lie in the window, are j = (dy + 1) * 3 + (dx + 1).
+# A key packs the unknown cells of the window in bits 0-24, then the reduced value of every
+# inner cell in a nibble from bit 25 on, NOT_A_CONSTRAINT for cells that are not revealed numbers.
+WINDOW_CELLS = [(dx, dy) for dy in range(-2, 3) for dx in range(-2, 3)]
+INNER_CELLS = [(dx, dy) for dy in range(-1, 2) for dx in range(-1, 2)]
+NOT_A_CONSTRAINT = 15
+
+TABLE_MAGIC = b"MSPT"
+TABLE_VERSION = 1
+TABLE_HEADER = struct.Struct("<4sHHI")	# magic, version, reserved, number of records
+TABLE_RECORD = struct.Struct("<QII")	# canonical key, safe cells, mine cells
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PatternTable.bin")
+
+# The 8 symmetries of the square, as maps of window offsets
+SYMMETRIES = [
+	lambda dx, dy: (dx, dy),
+	lambda dx, dy: (-dy, dx),
+	lambda dx, dy: (-dx, -dy),
+	lambda dx, dy: (dy, -dx),
+	lambda dx, dy: (-dx, dy),
+	lambda dx, dy: (dx, -dy),
+	lambda dx, dy: (dy, dx),
+	lambda dx, dy: (-dy, -dx),
+]
+WINDOW_PERMUTATIONS = [[WINDOW_CELLS.index(f(dx, dy)) for dx, dy in WINDOW_CELLS] for f in SYMMETRIES]
+INNER_PERMUTATIONS = [[INNER_CELLS.index(f(dx, dy)) for dx, dy in INNER_CELLS] for f in SYMMETRIES]
+
+
+def transformMask(mask: int, t: int) -> int:
+	permutation = WINDOW_PERMUTATIONS[t]
+	result = 0
+	while mask:
+		low = mask & -mask
+		result |= 1 << permutation[low.bit_length() - 1]
+		mask ^= low
+	return result
+
+
+def transformKey(key: int, t: int) -> int:
+	result = transformMask(key & 0x1ffffff, t)
+	values = key >> 25
+	for j, target in enumerate(INNER_PERMUTATIONS[t]):
+		result |= ((values >> (4 * j)) & 0xf) << (25 + 4 * target)
+	return result
+
+
+def canonicalKey(key: int) -> Tuple[int, int]:
+	'''
+	Returns the smallest key among the 8 symmetric images of key, and the symmetry giving it.
+	'''
+	return min((transformKey(key, t), t) for t in range(8))
+
+
+def solveWindow(key: int) -> Tuple[int, int]:
+	'''
+	Solves the constraints of the inner cells of a window by brute force, and returns the masks
+	of the window cells that are safe and that are mines in every solution.
+	Returns None if the window has no solution.
+	'''
+	unknown = key & 0x1ffffff
+	constraints = []
+	for j, (dx, dy) in enumerate(INNER_CELLS):
+		value = (key >> (25 + 4 * j)) & 0xf
+		if value == NOT_A_CONSTRAINT:
+			continue
+		cells = tuple(WINDOW_CELLS[w] for w, (wx, wy) in enumerate(WINDOW_CELLS)
+			if unknown >> w & 1 and max(abs(wx - dx), abs(wy - dy)) == 1)
+		if len(cells) < value:
+			return None
+		if cells:
+			constraints.append((cells, value))
+	safe = mines = 0
+	for solution in FrontierSolver(max_nodes=None, max_cells=25).solve(constraints):
+		if not solution.counts:
+			return None
+		forced_safe, forced_mines = solution.forced()
+		for cell in forced_safe:
+			safe |= 1 << WINDOW_CELLS.index(cell)
+		for cell in forced_mines:
+			mines |= 1 << WINDOW_CELLS.index(cell)
+	return safe, mines
+
+
+class PatternTable:
+	'''
+	Precomputed deductions for the 5x5 window around a revealed cell, keyed by the canonical
+	form of the window under the 8 symmetries of the board. The table file only holds canonical
+	windows with at least one forced cell, and every orientation of them is expanded when the
+	table is loaded, so a lookup is a single dictionary access on the raw window key.
+	shapes holds the unknown cells part of every key, so most windows can be turned down
+	before their values are even encoded.
+	'''
+
+	def __init__(self, filename: str = None):
+		self.canonical : Dict[int, Tuple[int, int]] = {}
+		self.oriented : Dict[int, Tuple[int, int]] = {}
+		self.shapes : Set[int] = set()
+		if filename and os.path.isfile(filename):
+			self.load(filename)
+
+	def load(self, filename: str):
+		with open(filename, "rb") as f:
+			data = f.read()
+		magic, version, _, count = TABLE_HEADER.unpack_from(data, 0)
+		if magic != TABLE_MAGIC or version != TABLE_VERSION:
+			raise ValueError("Not a pattern table: " + filename)
+		for key, safe, mines in TABLE_RECORD.iter_unpack(data[TABLE_HEADER.size:TABLE_HEADER.size + count * TABLE_RECORD.size]):
+			self.add(key, safe, mines)
+
+	def add(self, key: int, safe: int, mines: int):
+		'''
+		Adds the deductions of a canonical window, in all its orientations.
+		'''
+		self.canonical[key] = (safe, mines)
+		for t in range(8):
+			oriented = transformKey(key, t)
+			self.oriented[oriented] = (transformMask(safe, t), transformMask(mines, t))
+			self.shapes.add(oriented & 0x1ffffff)
+
+	def save(self, filename: str):
+		with open(filename, "wb") as f:
+			f.write(TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, 0, len(self.canonical)))
+			for key in sorted(self.canonical):
+				f.write(TABLE_RECORD.pack(key, *self.canonical[key]))
+
+	def __len__(self):
+		return len(self.canonical)
+
+	def lookup(self, key: int) -> Tuple[int, int]:
+		'''
+		Returns the masks of the safe and mine cells of the window, or None if the table has nothing.
+		'''
+		return self.oriented.get(key)
+
+
+__tables : Dict[str, PatternTable] = {}
+
+def loadTable(filename: str = TABLE_FILE) -> PatternTable:
+	'''
+	Returns the table stored in filename, loaded once per process. A missing file gives an empty table.
+	'''
+	if filename not in __tables:
+		__tables[filename] = PatternTable(filename)
+	return __tables[filename]
+
+
+class AnyShape:
+	def __contains__(self, shape: int) -> bool:
+		return True
+
+
+class WindowRecorder(PatternTable):
+	# A table that knows nothing and counts the windows it is asked about
+	def __init__(self):
+		super().__init__()
+		self.seen : Dict[int, int] = {}
+		self.shapes = AnyShape()
+
+	def lookup(self, key: int) -> Tuple[int, int]:
+		self.seen[key] = self.seen.get(key, 0) + 1
+		return None
+
+
+def buildTable(numWorlds: int, difficulties: List[str], seed: int, minCount: int = 1) -> PatternTable:
+	'''
+	Plays numWorlds seeded worlds of every difficulty, records the windows MyAI looks up, and
+	brute-force solves each distinct canonical window seen at least minCount times.
+	'''
+	import random
+	import MyAI
+	from World import World
+	from WorldStream import streamWorlds
+
+	recorder = WindowRecorder()
+	MyAI.loadTable = lambda filename=TABLE_FILE: recorder
+	try:
+		for difficulty in difficulties:
+			for world in streamWorlds(numWorlds, difficulty, seed):
+				random.seed("{}:{}".format(seed, world.name))
+				World(world=world).run()
+	finally:
+		MyAI.loadTable = loadTable
+
+	counts : Dict[int, int] = {}
+	for key, count in recorder.seen.items():
+		canonical, _ = canonicalKey(key)
+		counts[canonical] = counts.get(canonical, 0) + count
+
+	table = PatternTable()
+	for key, count in counts.items():
+		if count < minCount:
+			continue
+		result = solveWindow(key)
+		if result and (result[0] or result[1]):
+			table.add(key, *result)
+	return table
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Build the pattern table used by MyAI.")
+	parser.add_argument("-n", "--worlds", type=int, default=1000, help="worlds to play per difficulty")
+	parser.add_argument("-d", "--difficulty", action="append", help="difficulties to play (default: all three)")
+	parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the worlds played")
+	parser.add_argument("-m", "--min-count", type=int, default=2, help="keep windows seen at least this many times")
+	parser.add_argument("-o", "--output", default=TABLE_FILE, help="table file to write")
+	args = parser.parse_args()
+
+	table = buildTable(args.worlds, args.difficulty or ["beginner", "intermediate", "expert"], args.seed, args.min_count)
+	table.save(args.output)
+	print("{} windows written to {}".format(len(table), args.output))
@@ -14,6 +14,8 @@ import random
 from AI import AI
 from Action import Action
 
+BATCH_SIZE = 16
+
 
 class RandomAI ( AI ):
 	
@@ -35,4 +37,8 @@ class RandomAI ( AI ):
 		x = random.randrange(self.__colDimension)
 		y = random.randrange(self.__rowDimension)
 
-		return Action(action, x, y)
\ No newline at end of file
+		return Action(action, x, y)
+
+	def getActions(self, percepts: list) -> "list of Action Objects":
+		""" Percepts are ignored, so a whole batch of random moves can be returned at once """
+		return [self.getAction(-1) for _ in range(BATCH_SIZE)]
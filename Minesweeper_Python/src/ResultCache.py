@@ -0,0 +1,172 @@
+# ==============================CS-199==================================
+# FILE:			ResultCache.py
+#
+# DESCRIPTION:	This file contains the ResultCache class, an on-disk
+#				cache of the records of played worlds. A record is
+#				stored under a hash of the content of its world, of the
+#				source of the agent and of the run configuration, so a
+#				tournament only plays the worlds whose result could have
+#				changed since the last run.
+#
+# NOTES: 		- The agent fingerprint hashes MyAI.py, every module of
+#				  this directory it imports when loaded, directly or not,
+#				  and the pattern table. It also hashes World.py and
+#				  Tournament.py, which decide the outcome, the score and
+#				  the moves of a game and how its world is seeded.
+#				  Editing any other file keeps the cached results.
+#
+#				- Every entry is a small JSON file named by its key,
+#				  written atomically, so several processes can share a
+#				  cache directory. Entries are evicted least recently
+#				  used first, when evict is called, until the cache
+#				  fits in its size bound.
+#
+#				- A cached record keeps the times of the game that was
+#				  played, so summaries of cached runs report the times
+#				  of the original games.
+# ==============================CS-199==================================
+
+import os
+import ast
+import json
+import hashlib
+
+CACHE_VERSION = 1
+AGENT_MODULE = "MyAI"
+AGENT_DATA = ["PatternTable.bin"]
+# The game engine and the runner, whose rules decide the cached records
+ENGINE_MODULES = ["World", "Tournament"]
+
+
+def moduleImports(tree: ast.Module) -> "generator of str":
+	""" Yield the names of the modules imported by a module when it is loaded, leaving out imports inside functions """
+	nodes = list(tree.body)
+	while nodes:
+		node = nodes.pop()
+		if isinstance(node, ast.Import):
+			yield from (alias.name for alias in node.names)
+		elif isinstance(node, ast.ImportFrom):
+			if node.level == 0 and node.module:
+				yield node.module
+		elif not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+			nodes += ast.iter_child_nodes(node)
+
+
+def agentFingerprint(module: str = AGENT_MODULE) -> str:
+	""" Return a hash of the source of module, of the modules of this directory it imports, of the agent data """
+	""" files and of the engine modules """
+	directory = os.path.dirname(os.path.abspath(__file__))
+	sources = {}
+	pending = [module]
+	while pending:
+		name = pending.pop()
+		if name in sources:
+			continue
+		with open(os.path.join(directory, name + ".py"), "rb") as file:
+			sources[name] = file.read()
+		pending += [other for other in moduleImports(ast.parse(sources[name])) if os.path.isfile(os.path.join(directory, other + ".py"))]
+
+	for name in ENGINE_MODULES:
+		if name not in sources:
+			with open(os.path.join(directory, name + ".py"), "rb") as file:
+				sources[name] = file.read()
+
+	digest = hashlib.sha256()
+	for name in sorted(sources):
+		digest.update(name.encode() + b"\0" + hashlib.sha256(sources[name]).digest())
+	for name in AGENT_DATA:
+		path = os.path.join(directory, name)
+		if os.path.isfile(path):
+			with open(path, "rb") as file:
+				digest.update(name.encode() + b"\0" + hashlib.sha256(file.read()).digest())
+	return digest.hexdigest()
+
+
+class ResultCache():
+
+	def __init__(self, directory: str, maxBytes: int = 64 << 20, config: dict = None):
+		self.directory = directory
+		self.maxBytes = maxBytes
+		self.fingerprint = agentFingerprint()
+		self.config = json.dumps(config or {}, sort_keys=True)
+		self.hits = 0
+		self.misses = 0
+		self.stores = 0
+		self.evictions = 0
+
+	def key(self, world: bytes, name: str, config: dict) -> str:
+		""" Return the key of a world given its content, its name and the configuration of its game """
+		digest = hashlib.sha256()
+		for part in (str(CACHE_VERSION), self.fingerprint, self.config, json.dumps(config, sort_keys=True), name):
+			digest.update(part.encode() + b"\0")
+		digest.update(world)
+		return digest.hexdigest()
+
+	def get(self, key: str) -> dict:
+		""" Return the record stored under key, or None """
+		path = self.__path(key)
+		try:
+			with open(path) as file:
+				record = json.load(file)
+			os.utime(path)
+		except (OSError, ValueError):
+			return None
+		return record
+
+	def put(self, key: str, record: dict) -> None:
+		path = self.__path(key)
+		temporary = "{}.{}.tmp".format(path, os.getpid())
+		try:
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+			with open(temporary, 'w') as file:
+				json.dump(record, file)
+			os.replace(temporary, path)
+			self.stores += 1
+		except OSError:
+			pass
+
+	def count(self, hit: bool) -> None:
+		""" Count a lookup, which may have been made by another process """
+		if hit:
+			self.hits += 1
+		else:
+			self.misses += 1
+
+	def evict(self) -> None:
+		""" Delete the least recently used entries until the cache fits in maxBytes """
+		entries = self.__entries()
+		size = sum(entry[1] for entry in entries)
+		for path, entrySize, _ in sorted(entries, key=lambda entry: entry[2]):
+			if size <= self.maxBytes:
+				break
+			try:
+				os.remove(path)
+				self.evictions += 1
+				size -= entrySize
+			except OSError:
+				pass
+
+	def stats(self) -> dict:
+		entries = self.__entries()
+		return {"entries": len(entries), "bytes": sum(entry[1] for entry in entries), "hits": self.hits,
+			"misses": self.misses, "stores": self.stores, "evictions": self.evictions}
+
+	def __entries(self) -> list:
+		""" Return (path, size, last use) for every entry """
+		entries = []
+		if not os.path.isdir(self.directory):
+			return entries
+		for bucket in os.scandir(self.directory):
+			if not bucket.is_dir():
+				continue
+			for entry in os.scandir(bucket.path):
+				if entry.name.endswith(".json"):
+					try:
+						info = entry.stat()
+					except OSError:
+						continue
+					entries.append((entry.path, info.st_size, info.st_mtime))
+		return entries
+
+	def __path(self, key: str) -> str:
+		return os.path.join(self.directory, key[:2], key + ".json")
@@ -0,0 +1,48 @@
+# ==============================CS-199==================================
+# FILE:			ResultsSink.py
+#
+# DESCRIPTION:	This file contains the ResultsSink class, which streams
+#				one record per played world to a file as soon as the
+#				world is finished, so a long tournament can be followed
+#				with tail -f while it runs.
+#
+# NOTES: 		- The file is written as JSON Lines, or as CSV when its
+#				  name ends in .csv. Every record is flushed right away.
+#
+#				- A record holds the world name, its rows, columns and
+#				  mines, the outcome (won, mine, left or move limit),
+#				  the score, the moves made, the guesses of the agent,
+#				  and the wall time split into world setup and agent.
+# ==============================CS-199==================================
+
+import csv
+import json
+
+FIELDS = ["name", "rows", "cols", "mines", "outcome", "score", "moves", "guesses", "setup_time", "agent_time", "time"]
+
+
+class ResultsSink():
+
+	def __init__(self, filename: str):
+		self.__file = open(filename, 'w', newline='')
+		self.__csv = None
+		if filename.lower().endswith(".csv"):
+			self.__csv = csv.DictWriter(self.__file, FIELDS, extrasaction='ignore')
+			self.__csv.writeheader()
+
+	def write(self, record: dict) -> None:
+		""" Write the record of a single world and flush it """
+		if self.__csv:
+			self.__csv.writerow(record)
+		else:
+			self.__file.write(json.dumps({field: record.get(field) for field in FIELDS}) + "\n")
+		self.__file.flush()
+
+	def close(self) -> None:
+		self.__file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
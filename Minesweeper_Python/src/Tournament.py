@@ -0,0 +1,371 @@
+# ==============================CS-199==================================
+# FILE:			Tournament.py
+#
+# DESCRIPTION:	This file contains the tournament runner used by Main.py
+#				when it is given a directory of Minesweeper World files
+#				or a world corpus.
+#				Every world is played by playWorld, either in this
+#				process or spread over a pool of worker processes, and
+#				the per-world results are merged into a single
+#				TournamentResults object in world order.
+#
+# NOTES: 		- The source of a task is the path of a world file, a
+#				  (corpus path, board index) pair, or a WorldDefinition.
+#				  Each process maps a corpus once and keeps it open.
+#
+#				- When a seed is given, the random module is re-seeded
+#				  from (seed, world name) before every world, so a run
+#				  gives identical results whatever the number of jobs.
+#				  Only unseeded runs let the solvers of MyAI stop at a
+#				  wall-clock budget, which depends on the machine load.
+#
+#				- When stats are asked for, every MyAI game collects
+#				  per-phase timers and counters, which are kept per
+#				  board and written as JSON by writeStats.
+#
+#				- The record of every world is handed to a ResultsSink
+#				  as soon as it comes back, and the summary reports the
+#				  latency percentiles and throughput of all the worlds,
+#				  failed ones included. When games are recorded, their
+#				  traces are written to a trace file the same way.
+#
+#				- A run can be split into shards i/N, shard i playing
+#				  worlds i, i+N, i+2N... of the sorted world list. Each
+#				  shard writes a partial results file, and merging the
+#				  partial files of all the shards gives back the results
+#				  of the whole run, boards in their original order.
+#
+#				- Given a ResultCache, the tournament looks every world
+#				  up before playing it and stores the records of the
+#				  games it played. Only seeded MyAI games that are not
+#				  watched, recorded or instrumented are cached.
+# ==============================CS-199==================================
+
+import os
+import json
+import math
+import bisect
+import random
+import time
+from functools import partial
+from multiprocessing import Pool
+from AgentStats import enableStats
+from FrontierSolver import enableDeadlines
+from ResultCache import ResultCache
+from ResultsSink import ResultsSink
+from World import World
+from WorldCorpus import WorldCorpus
+from WorldDefinition import WorldDefinition
+
+try:
+	from tqdm import tqdm
+	tqdm_installed = True
+except ImportError:
+	tqdm_installed = False
+
+
+def listWorlds(directory: str) -> list:
+	""" Return the sorted list of world file paths found under directory """
+	worlds = []
+	for dirpath, _, filenames in os.walk(directory):
+		for filename in filenames:
+			worlds.append(os.path.join(dirpath, filename))
+	return sorted(worlds)
+
+
+def listCorpus(corpusFile: str) -> list:
+	""" Return a (corpus path, board index) source for every board of a corpus """
+	return [(corpusFile, i) for i in range(len(openCorpus(corpusFile)))]
+
+
+__corpora = {}
+
+def openCorpus(corpusFile: str) -> WorldCorpus:
+	""" Return the corpus mapped by this process, mapping it on first use """
+	if corpusFile not in __corpora:
+		__corpora[corpusFile] = WorldCorpus(corpusFile)
+	return __corpora[corpusFile]
+
+
+PARTIAL_VERSION = 1
+# Upper bounds in seconds of the buckets of the time histogram, the last bucket holds the slower boards
+HISTOGRAM_BOUNDS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10]
+
+
+def parseShard(shard: str) -> "tuple of ints":
+	""" Return (i, N) for a shard written "i/N", with 0 <= i < N """
+	try:
+		index, count = [int(x) for x in shard.split("/")]
+	except ValueError:
+		raise ValueError("Invalid shard: " + shard)
+	if count < 1 or not 0 <= index < count:
+		raise ValueError("Invalid shard: " + shard)
+	return index, count
+
+
+def shardIndices(total: int, shard: tuple) -> range:
+	""" Return the indices of the worlds played by a shard, out of total worlds """
+	index, count = shard
+	return range(index, total, count)
+
+
+def seedWorld(seed: int, name: str) -> None:
+	""" Seed the random module for a single world """
+	if seed is not None:
+		random.seed("{}:{}".format(seed, name))
+
+
+def percentile(sortedValues: list, p: float) -> float:
+	""" Return the nearest-rank p-th percentile of a sorted, non-empty list """
+	return sortedValues[max(0, math.ceil(p / 100 * len(sortedValues)) - 1)]
+
+
+def playWorld(task: tuple) -> tuple:
+	""" Play a single world and return (record, agent stats, encoded trace of the game if recorded) """
+	""" The record holds the name and score of the world, what World.getGameRecord tells """
+	""" about the game, and the wall time split into world setup and playing """
+	""" This is the entry point of the worker processes, so it must stay at module level """
+	source, aiType, verbose, debug, seed, stats, traceEvery, recordGame = task
+	enableStats(stats)
+	enableDeadlines(seed is None)
+	start_time = time.perf_counter()
+	if isinstance(source, (tuple, WorldDefinition)):
+		definition = openCorpus(source[0])[source[1]] if isinstance(source, tuple) else source
+		name = definition.name
+		seedWorld(seed, os.path.basename(name))
+		world = World(aiType=aiType, verbose=verbose, debug=debug, world=definition, traceEvery=traceEvery, record=recordGame)
+	else:
+		name = source
+		seedWorld(seed, os.path.basename(name))
+		world = World(filename=source, aiType=aiType, verbose=verbose, debug=debug, traceEvery=traceEvery, record=recordGame)
+
+	setup_time = time.perf_counter() - start_time
+	score = world.run()
+	elapsed = time.perf_counter() - start_time
+	record = {"name": name, "score": score, "setup_time": setup_time, "time": elapsed}
+	record.update(world.getGameRecord())
+	trace = world.getTrace()
+	return record, world.getAgentStats(), trace.encode() if trace is not None else None
+
+
+def cacheKey(cache: ResultCache, task: tuple) -> tuple:
+	""" Return the key of the result of a task in cache, or None when its game has to be played, and the world name """
+	source, aiType, verbose, debug, seed, stats, traceEvery, recordGame = task
+	if isinstance(source, (tuple, WorldDefinition)):
+		definition = openCorpus(source[0])[source[1]] if isinstance(source, tuple) else source
+		name = definition.name
+	else:
+		name = source
+	if aiType != "myai" or seed is None or verbose or debug or stats or traceEvery or recordGame:
+		return None, name
+	if isinstance(source, (tuple, WorldDefinition)):
+		world = "{} {} {} {} {}\n".format(definition.rowDimension, definition.colDimension,
+			definition.startX, definition.startY, definition.totalMines).encode() + bytes(definition.mines)
+	else:
+		with open(source, "rb") as file:
+			world = file.read()
+	return cache.key(world, os.path.basename(name), {"ai": aiType, "seed": seed}), name
+
+
+def playCached(cache: ResultCache, task: tuple) -> tuple:
+	""" Return the result of playWorld for a task, from cache when it holds it, with its cache key and whether it did """
+	key, name = cacheKey(cache, task)
+	record = cache.get(key) if key else None
+	if record is None:
+		return playWorld(task), key, False
+	# The same world may have been cached under another directory
+	record["name"] = name
+	return (record, None, None), key, True
+
+
+class TournamentResults():
+
+	def __init__(self, sink: ResultsSink = None, traceFile: "file object" = None):
+		self.numScores = 0
+		self.sumScores = 0
+		self.scoreBeg = 0
+		self.scoreInt = 0
+		self.scoreExp = 0
+		self.numSolved = 0
+		self.times = []
+		self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+		self.records = []
+		self.stats = []
+		self.sink = sink
+		self.traceFile = traceFile
+		self.started = time.perf_counter()
+		self.finished = self.started
+
+	def add(self, record: dict, stats: dict = None, trace: bytes = None) -> None:
+		""" Merge the record of a single world, and stream it to the sink and its trace to the trace file """
+		score = record["score"]
+		if self.sink:
+			self.sink.write(record)
+		if trace and self.traceFile:
+			self.traceFile.write(trace)
+		if stats is not None:
+			self.stats.append(dict(name=record["name"], score=score, **stats))
+		self.records.append(record)
+		self.times.append(record["time"])
+		self.histogram[bisect.bisect_left(HISTOGRAM_BOUNDS, record["time"])] += 1
+		self.finished = time.perf_counter()
+		if score > 0:
+			self.numSolved += 1
+		if score == 1:
+			self.scoreBeg += 1
+		elif score == 2:
+			self.scoreInt += 1
+		elif score == 3:
+			self.scoreExp += 1
+
+		self.numScores += 1
+		self.sumScores += score
+
+	def printSummary(self) -> None:
+		""" Print the results of the agent to the console """
+		""" Times cover every board, solved or not, and throughput the wall time of the whole run, """
+		""" which is the sum of the wall times of the shards for merged results """
+		print("---------------Your agent's results:---------------")
+		print("Beginner: {} \tIntermediate: {} \tExpert: {}".format(self.scoreBeg, self.scoreInt, self.scoreExp))
+		print("Cumulative Score: " + str(self.sumScores))
+		if len(self.times) > 0:
+			total_time = math.fsum(self.times)
+			sorted_times = sorted(self.times)
+			rounded_times = [round(x, 3) for x in sorted_times]
+			wall_time = self.finished - self.started
+			print(f"Boards: {self.numScores} ({self.numSolved} solved, {self.numScores - self.numSolved} failed)")
+			print(f"Average Time Per Board: {(total_time / len(self.times)):.3f}")
+			print(f"Best 5 Times: {rounded_times[:5]}")
+			print(f"Worst 5 Times: {list(reversed(rounded_times[-5:]))}")
+			print("Latency p50/p90/p99: {:.3f} / {:.3f} / {:.3f}".format(*(percentile(sorted_times, p) for p in (50, 90, 99))))
+			if wall_time > 0:
+				print(f"Throughput: {self.numScores / wall_time:.1f} boards/s")
+			print(f"Total Time Taken: {total_time:.3f}")
+		else:
+			print("No boards completed")
+		print("--------------------------------------------------")
+
+	def writeOutput(self, outputFilePath: str) -> None:
+		""" Write the aggregate scores to the output file """
+		try:
+			with open(outputFilePath, 'w') as file:
+				file.write("easy: " + str(self.scoreBeg) + "\n")
+				file.write("medium: " + str(self.scoreInt) + "\n")
+				file.write("expert: " + str(self.scoreExp) + "\n")
+				file.write("score: " + str(self.sumScores))
+		except:
+			print("ERROR: Could not open file for writing!")
+
+	def writePartial(self, partialFilePath: str, shard: tuple, indices: "list of ints") -> None:
+		""" Write the partial results file of a shard, indices being the positions of its worlds in the whole run """
+		partial = {
+			"version": PARTIAL_VERSION,
+			"shard": list(shard),
+			"counts": self.counts(),
+			"wallTime": self.finished - self.started,
+			"histogram": {"bounds": HISTOGRAM_BOUNDS, "counts": self.histogram},
+			"boards": [dict(index=i, **record) for i, record in zip(indices, self.records)],
+			"stats": self.stats,
+		}
+		try:
+			with open(partialFilePath, 'w') as file:
+				json.dump(partial, file)
+		except OSError:
+			print("ERROR: Could not write the partial results file!")
+
+	def counts(self) -> dict:
+		return {"boards": self.numScores, "solved": self.numSolved, "score": self.sumScores,
+			"beginner": self.scoreBeg, "intermediate": self.scoreInt, "expert": self.scoreExp}
+
+	def writeStats(self, statsFilePath: str) -> None:
+		""" Write the agent stats of every world, in world order, as a JSON list """
+		try:
+			with open(statsFilePath, 'w') as file:
+				json.dump(self.stats, file, indent=1)
+		except OSError:
+			print("ERROR: Could not write the stats file!")
+
+
+def mergePartials(partialFilePaths: list, sink: ResultsSink = None) -> tuple:
+	""" Combine the partial results files of shards into the results of the whole run """
+	""" Returns the results and the shards that are missing. Raises ValueError when the files """
+	""" are not partial results of the same run, or do not agree with their own records """
+	boards = []
+	stats = []
+	wallTime = 0.0
+	histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+	counts = {}
+	shards = set()
+	numShards = None
+	for partialFilePath in partialFilePaths:
+		with open(partialFilePath) as file:
+			partial = json.load(file)
+		if not isinstance(partial, dict) or partial.get("version") != PARTIAL_VERSION:
+			raise ValueError("Not a partial results file: " + partialFilePath)
+		index, count = partial["shard"]
+		if numShards is not None and count != numShards:
+			raise ValueError("Partial results of runs split in {} and {} shards".format(numShards, count))
+		if index in shards:
+			raise ValueError("Shard {}/{} is given twice".format(index, count))
+		if partial["histogram"]["bounds"] != HISTOGRAM_BOUNDS:
+			raise ValueError("Partial results with another time histogram: " + partialFilePath)
+		numShards = count
+		shards.add(index)
+		boards += partial["boards"]
+		stats += partial["stats"]
+		wallTime += partial["wallTime"]
+		histogram = [a + b for a, b in zip(histogram, partial["histogram"]["counts"])]
+		for key, value in partial["counts"].items():
+			counts[key] = counts.get(key, 0) + value
+
+	boards.sort(key=lambda board: board["index"])
+	if len(set(board["index"] for board in boards)) != len(boards):
+		raise ValueError("Partial results with the same board twice")
+	results = TournamentResults(sink)
+	for board in boards:
+		del board["index"]
+		results.add(board)
+	if results.counts() != counts or results.histogram != histogram:
+		raise ValueError("Partial results that do not match their own boards")
+	order = {record["name"]: i for i, record in enumerate(results.records)}
+	results.stats = sorted(stats, key=lambda entry: order.get(entry["name"], len(order)))
+	results.started = 0.0
+	results.finished = wallTime
+	missing = [i for i in range(numShards or 0) if i not in shards]
+	return results, missing
+
+
+def runTournament(tasks: "iterable", jobs: int = 1, total: int = None, sink: ResultsSink = None, traceFile: "file object" = None, cache: ResultCache = None) -> TournamentResults:
+	""" Play every task, using a pool of jobs worker processes when jobs > 1 """
+	""" tasks may be a generator, in which case total is its length """
+	""" The record of every world goes to sink as soon as it is merged, and its trace to traceFile """
+	""" With a cache, worlds it holds are not played again, and the records of played ones are stored """
+	results = TournamentResults(sink, traceFile)
+	if total is None:
+		total = len(tasks)
+	play = playWorld if cache is None else partial(playCached, cache)
+
+	def merge(result):
+		if cache is not None:
+			result, key, hit = result
+			if key:
+				cache.count(hit)
+				if not hit:
+					cache.put(key, result[0])
+		results.add(*result)
+
+	if jobs > 1:
+		# Small chunks keep the workers balanced, since expert boards take much longer than beginner ones
+		chunksize = max(1, total // (jobs * 16))
+		with Pool(jobs) as pool:
+			played = pool.imap(play, tasks, chunksize)
+			if tqdm_installed:
+				played = tqdm(played, total=total)
+			for result in played:
+				merge(result)
+	else:
+		if tqdm_installed:
+			tasks = tqdm(tasks, total=total)
+		for task in tasks:
+			merge(play(task))
+	return results
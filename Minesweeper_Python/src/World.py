@@ -12,35 +12,51 @@
 # ==============================CS-199==================================
 
 import random
+import operator
+import time
 from ManualAI import ManualAI
 from RandomAI import RandomAI
 from MyAI import MyAI
 from AI import AI
+from BoardRenderer import BoardRenderer
+from GameTrace import GameTrace
+
+try:
+	import numpy as np
+	numpy_installed = True
+except ImportError:
+	numpy_installed = False
 
 
 class World():
 
-	# Tile class
-	class __Tile():
-		mine = False
-		covered = True
-		flag = False
-		number = 0
-		
+	# The board is stored as four flat planes with one byte per tile,
+	# tile (c, r) living at index r * colDimension + c:
+	#	__mines		1 if the tile holds a mine
+	#	__covered	1 while the tile is covered
+	#	__flags		1 if the tile is flagged
+	#	__numbers	hint number of the tile
 
-	def __init__(self, filename=None, aiType="myai", verbose=False, debug=False):
+	def __init__(self, filename=None, aiType="myai", verbose=False, debug=False, world=None, traceEvery=0, record=False):
 		self.__verbose = verbose
 		self.__debug = debug
+		self.__traceEvery = traceEvery
+		self.__lastFrame = -traceEvery
 
 		self.__colDimension = 0
 		self.__rowDimension = 0
 		self.__score = 0
-		self.__board = None
+		self.__mines = None
+		self.__covered = None
+		self.__flags = None
+		self.__numbers = None
 		self.__totalMines = 0
 		self.__flagsLeft = 0
 		self.__coveredTiles = 0
 		self.__movesMade = 0
 		self.__movesLimit = 0
+		self.__outcome = None
+		self.__agentTime = 0.0
 
 		self.__perceptNumber = 0
 		self.__lastTile = None
@@ -59,6 +75,16 @@ class World():
 					self.__uncoverTile(firstMoveCoords[0], firstMoveCoords[1])
 					self.__lastTile = (firstMoveCoords[0]+1, firstMoveCoords[1]+1)
 					self.__lastAction = "UNCOVER"
+
+		# If a WorldDefinition is provided, construct board from it
+			elif world != None:
+				firstMoveCoords = self.__loadDefinition(world)
+				self.__addNumbers()
+				self.__coveredTiles = self.__colDimension * self.__rowDimension
+				self.__flagsLeft = self.__totalMines
+				self.__uncoverTile(firstMoveCoords[0], firstMoveCoords[1])
+				self.__lastTile = (firstMoveCoords[0]+1, firstMoveCoords[1]+1)
+				self.__lastAction = "UNCOVER"
 					
 		# If file not provided, construct board using defaults
 			else:
@@ -75,6 +101,14 @@ class World():
 		except ValueError as e:
 			print("Error: Cannot create board!")
 
+		# The moves of the game, when it is recorded
+		self.__trace = None
+		if record:
+			name = filename or (world.name if world else "random")
+			self.__trace = GameTrace(name, self.__rowDimension, self.__colDimension, firstMoveCoords[0], firstMoveCoords[1], self.__totalMines, self.__mineBitmap())
+
+		# Without an agent, the game is played from outside through play
+		self.__ai = None
 		if aiType == "manual":
 			self.__ai = ManualAI()
 		elif aiType == "random":
@@ -82,51 +116,144 @@ class World():
 		elif aiType == "myai":
 			self.__ai = MyAI(self.__rowDimension, self.__colDimension, self.__totalMines, firstMoveCoords[0], firstMoveCoords[1])
 
+		# Whether the board is printed after every move
+		self.__manual = type(self.__ai) == ManualAI
+		self.__display = self.__manual or self.__debug
+		# Frames are only redrawn in place when nothing else is printed between them,
+		# which is not the case with the prompts of ManualAI
+		self.__renderer = None
+		if self.__display:
+			self.__renderer = BoardRenderer(self.__rowDimension, self.__colDimension, ansi=False if self.__manual else None)
+
 		if (self.__verbose and filename):
 			print("Running on world: " + filename)
+		elif (self.__verbose and world):
+			print("Running on world: " + world.name)
 
 
 	def run(self) -> int:
 		""" Engine of the game """
+		percepts = [self.__perceptNumber]
 		while (True):
-			if type(self.__ai) == ManualAI or self.__debug:
-				self.__printWorld()
+			if self.__display:
+				self.__traceWorld()
 			if self.__movesMade > self.__movesLimit:
+				self.__outcome = "move limit"
 				break;
 
 			try: 
-				action = self.__ai.getAction(self.__perceptNumber)
-				if self.__checkValidAction(action):
-					if self.__doMove(action):
-						break
+				start = time.perf_counter()
+				actions = self.__ai.getActions(percepts)
+				self.__agentTime += time.perf_counter() - start
+				if self.__doBatch(actions, percepts):
+					break
 			except ValueError:
-				print("Error: Invalid action!")
-			except IndexError:
-				print("Error: Move is out of bounds!")
+				self.__printMessage("Error: Invalid action!")
 
-			if self.__debug and type(self.__ai) != ManualAI:
+			if self.__debug and not self.__manual and not self.__traceEvery:
 				input("Press ENTER to continue...")
+				self.__renderer.invalidate()
+		score = self.finish()
+		if self.__display:
+			self.__printWorld()
+		return score
+
+	def getPercept(self) -> int:
+		""" Return the percept of the last move, the starting tile before any move """
+		return self.__perceptNumber
+
+	def play(self, actions: "list of Action Objects") -> tuple:
+		""" Apply a batch of actions chosen outside of the World, for games without an agent """
+		""" Returns the percepts, exactly as AI.getActions would receive them, and whether the game is over """
+		if self.__movesMade > self.__movesLimit:
+			self.__outcome = "move limit"
+			return [self.__perceptNumber], True
+		percepts = []
+		gameOver = self.__doBatch(actions, percepts)
+		return percepts, gameOver
+
+	def finish(self) -> int:
+		""" End the game, uncover every tile and return the score """
 		self.__handleGameover()
 		self.__uncoverAll()
-		if type(self.__ai) == ManualAI or self.__debug:
-			self.__printWorld()
-
+		score = 0
 		if self.__score == (self.__colDimension * self.__rowDimension) - self.__totalMines:
+			self.__outcome = "won"
 			if self.__rowDimension == 8 and self.__colDimension == 8:
-				return 1
+				score = 1
 			elif self.__rowDimension == 16 and self.__colDimension == 16:
-				return 2
+				score = 2
 			elif self.__rowDimension == 16 and self.__colDimension == 30:
-				return 3
+				score = 3
 			else:
-				return 1
-		else:
-			return 0
+				score = 1
+		if self.__trace is not None:
+			self.__trace.score = score
+		return score
+
+	def getTrace(self) -> GameTrace:
+		""" Return the recorded game, or None if it is not recorded """
+		return self.__trace
+
+	def printBoard(self) -> None:
+		""" Print the board as it is now, for a World created in debug mode """
+		self.__printWorld()
+
+	def getGameRecord(self) -> dict:
+		""" Return the board and how the game went: dimensions, outcome, moves, the time spent """
+		""" in the agent and its guesses (None when the agent does not count them) """
+		return {
+			"rows": self.__rowDimension,
+			"cols": self.__colDimension,
+			"mines": self.__totalMines,
+			"outcome": self.__outcome,
+			"moves": self.__movesMade,
+			"guesses": self.__ai.getGuesses() if self.__ai else None,
+			"agent_time": self.__agentTime,
+		}
+
+	def getAgentStats(self) -> dict:
+		""" Return the instrumentation collected by the agent, or None if it has none """
+		return self.__ai.getStats() if self.__ai else None
 
 
 	###############################################
 	#				ACTIONS ON BOARD 			  #
 	###############################################
+	def __doBatch(self, actions: "list of Action Objects", percepts: list) -> bool:
+		""" Apply a batch of actions in order, replacing percepts with the percept of each applied action """
+		""" Stops early at an invalid action, and returns True when the game is over """
+		applied = []
+		gameOver = not actions
+		if gameOver:
+			self.__outcome = "left"
+		for i, action in enumerate(actions):
+			if i > 0:
+				if self.__display:
+					self.__traceWorld()
+				if self.__movesMade > self.__movesLimit:
+					self.__outcome = "move limit"
+					gameOver = True
+					break
+			try:
+				if self.__checkValidAction(action):
+					over = self.__doMove(action)
+					if self.__trace is not None:
+						self.__trace.addMove(action.getMove(), action.getX(), action.getY(), None if over else self.__perceptNumber)
+					if over:
+						gameOver = True
+						break
+					applied.append(self.__perceptNumber)
+			except ValueError:
+				self.__printMessage("Error: Invalid action!")
+				break
+			except IndexError:
+				self.__printMessage("Error: Move is out of bounds!")
+				break
+		percepts[:] = applied if applied else [self.__perceptNumber]
+		return gameOver
+
+
 	def __checkValidAction(self, actionObj: "Action Object") -> bool:
 		""" Check if move is valid, and if coordinates are valid, returning a boolean """
 		move = actionObj.getMove()
@@ -159,27 +286,29 @@ class World():
 
 		# LEAVE
 		if move == AI.Action.LEAVE:
-			if type(self.__ai) == ManualAI or self.__debug:
-				print("Leaving game...")
+			if self.__display:
+				self.__printMessage("Leaving game...")
+			self.__outcome = "left"
 			return True 							# Agent decides to leave game
 		# UNCOVER
 		elif move == AI.Action.UNCOVER:
-			if self.__board[X][Y].mine:
-				if type(self.__ai) == ManualAI or self.__debug:
-					print("Gameover! Uncovered a mine! " + str(X+1), str(Y+1))
+			if self.__mines[Y * self.__colDimension + X]:
+				if self.__display:
+					self.__printMessage("Gameover! Uncovered a mine! " + str(X+1) + " " + str(Y+1))
+				self.__outcome = "mine"
 				return True 						# Agent uncovered a mine
-			if type(self.__ai) == ManualAI:
-				print("Uncovering: " + str(X+1) + ", " + str(Y+1))
+			if self.__manual:
+				self.__printMessage("Uncovering: " + str(X+1) + ", " + str(Y+1))
 			self.__uncoverTile(X, Y)
 		# FLAG
 		elif move == AI.Action.FLAG:
-			if type(self.__ai) == ManualAI:
-				print("Flagging: " + str(X+1) + ", " + str(Y+1))
+			if self.__manual:
+				self.__printMessage("Flagging: " + str(X+1) + ", " + str(Y+1))
 			self.__flagTile(X, Y)
 		# UNFLAG
 		elif move == AI.Action.UNFLAG:
-			if type(self.__ai) == ManualAI:
-				print("Unflagging: " + str(X+1) + ", " + str(Y+1))
+			if self.__manual:
+				self.__printMessage("Unflagging: " + str(X+1) + ", " + str(Y+1))
 			self.__unflagTile(X, Y)
 		return False 								# Game continues
 
@@ -188,17 +317,24 @@ class World():
 	#			SETTING UP THE GAME BOARD   			#
 	#####################################################
 	def __createBoard(self, inputStream: "filePointer" = None) -> None:
-		""" Creates 2D tile array from first line of file and instantiates board instance variable """
+		""" Reads dimensions from first line of file and allocates the board planes """
 		if inputStream:
 			self.__rowDimension, self.__colDimension = [int(x) for x in inputStream.readline().split()]
-			self.__board = [[self.__Tile() for i in range(self.__rowDimension)] for j in range(self.__colDimension)]
 		else:
 			self.__colDimension = 8		# Default sizes
 			self.__rowDimension = 8		# Default size
 
-			self.__board = [[self.__Tile() for i in range(self.__rowDimension)] for j in range(self.__colDimension)]
-		
-		self.__movesLimit = self.__colDimension * self.__rowDimension * 2
+		self.__allocateBoard()
+
+
+	def __allocateBoard(self) -> None:
+		""" Instantiates the board planes for the current dimensions """
+		size = self.__colDimension * self.__rowDimension
+		self.__mines = bytearray(size)
+		self.__covered = bytearray(b"\x01") * size
+		self.__flags = bytearray(size)
+		self.__numbers = bytearray(size)
+		self.__movesLimit = size * 2
 
 
 	def __getFirstMove(self, inputStream: "filePointer" = None) -> "tuple of ints": 
@@ -210,12 +346,32 @@ class World():
 		else:
 			startX = self.__randomInt(self.__colDimension)
 			startY = self.__randomInt(self.__rowDimension)
-			while (self.__board[startX][startY].number != 0 or self.__board[startX][startY].mine):
+			while (self.__numbers[startY * self.__colDimension + startX] != 0 or self.__mines[startY * self.__colDimension + startX]):
 				startX = self.__randomInt(self.__colDimension)
 				startY = self.__randomInt(self.__rowDimension)
 		return (startX, startY)
 
 
+	def __loadDefinition(self, world: "WorldDefinition") -> "tuple of ints":
+		""" Create the board from a WorldDefinition, add its mines, and return the first move """
+		self.__rowDimension = world.rowDimension
+		self.__colDimension = world.colDimension
+		self.__allocateBoard()
+
+		if not self.__isInBounds(world.startX, world.startY):
+			raise ValueError('First move coordinates are invalid')
+		if numpy_installed:
+			# The mine bitmap has the same tile order as the planes, so it unpacks straight into __mines
+			size = self.__colDimension * self.__rowDimension
+			bits = np.unpackbits(np.frombuffer(world.mines, dtype=np.uint8), count=size, bitorder='little')
+			self.__mines = bytearray(bits.tobytes())
+			self.__totalMines += int(np.count_nonzero(bits))
+		else:
+			for c, r in world.minePositions():
+				self.__addMine(c, r)
+		return (world.startX, world.startY)
+
+
 	def __addMines(self, inputStream: "filePointer" = None) -> None:
 		""" Add mines to the game board""" 
 		if inputStream:
@@ -228,58 +384,74 @@ class World():
 			while currentMines < 10:	# Default number of mines is 10
 				r = self.__randomInt(self.__rowDimension)
 				c = self.__randomInt(self.__colDimension)
-				if not self.__board[c][r].mine:
+				if not self.__mines[r * self.__colDimension + c]:
 					self.__addMine(c, r)
 					currentMines += 1
 
 					
+	def __mineBitmap(self) -> bytes:
+		""" Pack the mine plane into the bitmap layout of WorldDefinition """
+		bitmap = bytearray((len(self.__mines) + 7) // 8)
+		for i, mine in enumerate(self.__mines):
+			if mine:
+				bitmap[i >> 3] |= 1 << (i & 7)
+		return bytes(bitmap)
+
+
 	def __addMine(self, c: int, r: int) -> None:
-		""" Add mine to tile located at (c, r) and update the Tile.mine attrbute """
-		self.__board[c][r].mine = True
+		""" Add mine to tile located at (c, r) and update the mine plane """
+		self.__mines[r * self.__colDimension + c] = 1
 		self.__totalMines += 1		
 
 
 	def __addNumbers(self) -> None:
-		""" Iterate the board and add hint numbers for each mine """
-		for r in range(self.__rowDimension):
-			for c in range(self.__colDimension):
-				if self.__board[c][r].mine:
-					self.__addHintNumber(c, r+1)
-					self.__addHintNumber(c, r-1)
-					self.__addHintNumber(c+1, r)
-					self.__addHintNumber(c-1, r)
-					self.__addHintNumber(c-1, r+1)
-					self.__addHintNumber(c+1, r+1)
-					self.__addHintNumber(c-1, r-1)
-					self.__addHintNumber(c+1, r-1)
-
-
-	def __addHintNumber(self, c: int, r: int) -> None:
-		""" Increment the hint number of a tile """
-		if self.__isInBounds(c, r):
-			self.__board[c][r].number += 1
+		""" Compute the hint number of every tile as the sum of its neighbouring mines """
+		if numpy_installed:
+			mines = np.frombuffer(self.__mines, dtype=np.uint8).reshape(self.__rowDimension, self.__colDimension)
+			padded = np.pad(mines, 1)
+			numbers = np.zeros_like(mines)
+			for dr in range(3):
+				for dc in range(3):
+					if dr != 1 or dc != 1:
+						numbers += padded[dr:dr + self.__rowDimension, dc:dc + self.__colDimension]
+			self.__numbers = bytearray(numbers.tobytes())
+			return
+
+		# Without NumPy, count into a plane with a one tile border so no bounds checks are needed
+		cols = self.__colDimension
+		width = cols + 2
+		padded = bytearray(width * (self.__rowDimension + 2))
+		offsets = (-width-1, -width, -width+1, -1, 1, width-1, width, width+1)
+		i = self.__mines.find(1)
+		while i != -1:
+			p = (i // cols + 1) * width + i % cols + 1
+			for o in offsets:
+				padded[p + o] += 1
+			i = self.__mines.find(1, i+1)
+		self.__numbers = bytearray().join(padded[r * width + 1:r * width + 1 + cols] for r in range(1, self.__rowDimension + 1))
 
 
 	def __uncoverTile(self, c: int, r: int) -> None:
 		""" Uncovers a tile """
-		if self.__board[c][r].covered:
-			self.__board[c][r].covered = False
+		i = r * self.__colDimension + c
+		if self.__covered[i]:
+			self.__covered[i] = 0
 			self.__coveredTiles -= 1
-		self.__perceptNumber = self.__board[c][r].number
+		self.__perceptNumber = self.__numbers[i]
 
 
 	def __uncoverAll(self) -> None:
 		""" Uncovers all tiles """
-		for r in range(self.__rowDimension):
-			for c in range(self.__colDimension):
-				self.__uncoverTile(c, r)
+		self.__covered = bytearray(len(self.__covered))
+		self.__perceptNumber = self.__numbers[-1]
 		self.__coveredTiles = 0
 
 
 	def __flagTile(self, c: int, r: int) -> None:
 		""" Flag a tile, coordinates adjusted to fix indexing """
-		if self.__board[c][r].covered and not self.__board[c][r].flag and self.__flagsLeft > 0:
-			self.__board[c][r].flag = True
+		i = r * self.__colDimension + c
+		if self.__covered[i] and not self.__flags[i] and self.__flagsLeft > 0:
+			self.__flags[i] = 1
 			self.__flagsLeft -= 1
 		if self.__flagsLeft < 0:
 			self.__flagsLeft = 0
@@ -288,8 +460,9 @@ class World():
 
 	def __unflagTile(self, c: int, r: int) -> None:
 		""" Unflag a tile, coordinates adjusted to fix indexing """
-		if self.__board[c][r].covered and self.__board[c][r].flag:
-			self.__board[c][r].flag = False
+		i = r * self.__colDimension + c
+		if self.__covered[i] and self.__flags[i]:
+			self.__flags[i] = 0
 			self.__flagsLeft += 1
 		if self.__flagsLeft > 10:
 			self.__flagsLeft = 10
@@ -298,11 +471,13 @@ class World():
 
 	def __handleGameover(self) -> None:
 		""" Check game board for completion after AI is done """
-		for r in range(self.__rowDimension):
-			for c in range(self.__colDimension):
-				# If all safe tiles are uncovered
-				if not self.__board[c][r].covered and not self.__board[c][r].mine:
-					self.__score += 1
+		# Score every tile that is neither covered nor a mine
+		if numpy_installed:
+			covered = np.frombuffer(self.__covered, dtype=np.uint8)
+			mines = np.frombuffer(self.__mines, dtype=np.uint8)
+			self.__score += int(np.count_nonzero((covered | mines) == 0))
+		else:
+			self.__score += bytes(map(operator.or_, self.__covered, self.__mines)).count(0)
 
 
 	#############################################
@@ -310,57 +485,31 @@ class World():
 	#############################################
 	def __printWorld(self) -> None:
 		""" Prints to console information about Minesweeper World """
-		self.__printBoardInfo()
-		self.__printActionInfo()
-		self.__printAgentInfo()
-
-
-	def __printBoardInfo(self) -> None:
-		""" Print board for debugging """
-		print("\nNumber of mines: " + str(self.__totalMines))
-		print("Number of flags left: " + str(self.__flagsLeft))
-
-		board_as_string = ""
-		print("", end=" ")
-		for r in range(self.__rowDimension - 1, -1, -1):
-			print(str(r+1).ljust(2) + '|', end=" ")
-			for c in range(self.__colDimension):
-				self.__printTileInfo(c, r)
-			if (r != 0):
-				print('\n', end=" ")
-
-		column_label = "     "
-		column_border = "   "
-		for c in range(1, self.__colDimension+1):
-			column_border += "---"
-			column_label += str(c).ljust(3)
-		print(board_as_string)
-		print(column_border)
-		print(column_label)
-
-
-	def __printAgentInfo(self) -> None:
-		""" Prints information about the board that are useful to the user """
-		print("Tiles covered: " + str(self.__coveredTiles) + " | Flags left: " + str(self.__flagsLeft) + " | Last action: {} on {}".format(self.__lastAction, self.__lastTile))
-
-
-	def __printActionInfo(self) -> None:
-		""" Prints available actions to the user if agent is ManualAI """
-		if type(self.__ai) == ManualAI:
-			print("Press \"L\" to leave game\nPress \"U\" to uncover a tile\nPress \"F\" to flag a tile\nPress \"N\" to unflag a tile: ")
-
-
-	def __printTileInfo(self, c: int, r: int) -> None:
-		""" Checks tile attributes and prints accordingly """
-		if not self.__board[c][r].covered and self.__board[c][r].mine:
-			print('B ', end=" ")
-		elif not self.__board[c][r].covered:
-			print(str(self.__board[c][r].number) + ' ', end=" ")
-		elif self.__board[c][r].flag:
-			print('? ', end=" ")
-		elif self.__board[c][r].covered:
-			print('. ', end=" ")
-		
+		mines, covered, flags, numbers = self.__mines, self.__covered, self.__flags, self.__numbers
+		tiles = "".join(
+			('?' if flags[i] else '.') if covered[i] else ('B' if mines[i] else str(numbers[i]))
+			for i in range(self.__rowDimension * self.__colDimension))
+		header = ["", "Number of mines: " + str(self.__totalMines), "Number of flags left: " + str(self.__flagsLeft)]
+		footer = []
+		if self.__manual:
+			footer += ["Press \"L\" to leave game", "Press \"U\" to uncover a tile", "Press \"F\" to flag a tile", "Press \"N\" to unflag a tile: "]
+		footer.append("Tiles covered: " + str(self.__coveredTiles) + " | Flags left: " + str(self.__flagsLeft) + " | Last action: {} on {}".format(self.__lastAction, self.__lastTile))
+		self.__renderer.render(tiles, header, footer)
+		self.__lastFrame = self.__movesMade
+
+
+	def __traceWorld(self) -> None:
+		""" Prints the board if it is time for a new frame: every move, or every traceEvery moves """
+		if self.__manual or self.__movesMade - self.__lastFrame >= self.__traceEvery:
+			self.__printWorld()
+
+
+	def __printMessage(self, message: str) -> None:
+		""" Prints a line under the board, so the next frame has to be drawn in full under it """
+		print(message)
+		if self.__renderer:
+			self.__renderer.invalidate()
+
 
 	#####################################################
 	#		         HELPER FUNCTIONS					#
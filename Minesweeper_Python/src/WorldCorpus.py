@@ -0,0 +1,85 @@
+# ==============================CS-199==================================
+# FILE:			WorldCorpus.py
+#
+# DESCRIPTION:	This file contains the WorldCorpus class. A corpus is a
+#				single binary file holding many Minesweeper worlds. It
+#				is written by WorldGenerator.py and read here through
+#				mmap, so board i can be fetched without parsing or
+#				copying any of the other boards.
+#
+# NOTES: 		- All integers are little-endian. The layout is:
+#
+#					header	magic "MSWC", version (uint16), reserved
+#							(uint16), count (uint32), offset of the
+#							index (uint64)
+#					records	rows, cols, startX, startY (uint16 each),
+#							number of mines (uint32), length of the
+#							name (uint16), the UTF-8 name, and then
+#							the mine bitmap described in
+#							WorldDefinition.py
+#					index	count offsets (uint64), one per record
+#
+#				- Boards returned by the corpus reference the mapped
+#				  file, so the corpus must stay open while they are
+#				  used.
+# ==============================CS-199==================================
+
+import mmap
+import struct
+from WorldDefinition import WorldDefinition
+
+CORPUS_MAGIC = b"MSWC"
+CORPUS_VERSION = 1
+CORPUS_HEADER = struct.Struct("<4sHHIQ")
+CORPUS_RECORD = struct.Struct("<HHHHIH")
+CORPUS_OFFSET = struct.Struct("<Q")
+
+
+class WorldCorpus():
+
+	def __init__(self, filename: str):
+		self.filename = filename
+		with open(filename, 'rb') as file:
+			self.__map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+		self.__view = memoryview(self.__map)
+
+		magic, version, _, self.__count, self.__indexOffset = CORPUS_HEADER.unpack_from(self.__map, 0)
+		if magic != CORPUS_MAGIC or version != CORPUS_VERSION:
+			self.close()
+			raise ValueError('Not a world corpus: ' + filename)
+
+	@staticmethod
+	def isCorpus(filename: str) -> bool:
+		""" Returns true if the file starts with the corpus magic number """
+		try:
+			with open(filename, 'rb') as file:
+				return file.read(len(CORPUS_MAGIC)) == CORPUS_MAGIC
+		except OSError:
+			return False
+
+	def __len__(self):
+		return self.__count
+
+	def __getitem__(self, i: int) -> WorldDefinition:
+		""" Return board i, with its mine bitmap viewing the mapped file """
+		if i < 0:
+			i += self.__count
+		if i < 0 or i >= self.__count:
+			raise IndexError('Corpus index out of range')
+
+		offset, = CORPUS_OFFSET.unpack_from(self.__map, self.__indexOffset + i * CORPUS_OFFSET.size)
+		rows, cols, startX, startY, totalMines, nameLength = CORPUS_RECORD.unpack_from(self.__map, offset)
+		offset += CORPUS_RECORD.size
+		name = bytes(self.__view[offset:offset + nameLength]).decode('utf-8')
+		offset += nameLength
+		mines = self.__view[offset:offset + (rows * cols + 7) // 8]
+		return WorldDefinition(name, rows, cols, startX, startY, totalMines, mines)
+
+	def __iter__(self):
+		for i in range(self.__count):
+			yield self[i]
+
+	def close(self) -> None:
+		""" Unmap the corpus file """
+		self.__view.release()
+		self.__map.close()
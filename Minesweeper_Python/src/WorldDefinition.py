@@ -0,0 +1,48 @@
+# ==============================CS-199==================================
+# FILE:			WorldDefinition.py
+#
+# DESCRIPTION:	This file contains the WorldDefinition class. This class
+#				stores everything needed to build a Minesweeper World
+#				without reading a world file: the dimensions, the
+#				starting tile and a bitmap of the mines.
+#
+# NOTES: 		- startX and startY are 0-indexed, like the coordinates
+#				  used inside World.
+#
+#				- Bit (r * colDimension + c) of the mine bitmap is set
+#				  when tile (c, r) holds a mine. Row 0 is the bottom row
+#				  of the board. Bit i lives in byte i >> 3, at position
+#				  i & 7.
+#
+#				- The mine bitmap can be any bytes-like object, for
+#				  example a memoryview over a memory-mapped corpus.
+# ==============================CS-199==================================
+
+class WorldDefinition():
+
+	def __init__(self, name: str, rowDimension: int, colDimension: int, startX: int, startY: int, totalMines: int, mines: "bytes-like"):
+		self.name = name
+		self.rowDimension = rowDimension
+		self.colDimension = colDimension
+		self.startX = startX
+		self.startY = startY
+		self.totalMines = totalMines
+		self.mines = mines
+
+	def isMine(self, c: int, r: int) -> bool:
+		""" Returns true if tile (c, r) holds a mine """
+		i = r * self.colDimension + c
+		return bool(self.mines[i >> 3] & (1 << (i & 7)))
+
+	def minePositions(self) -> "generator of (c, r)":
+		""" Yields the (c, r) coordinates of every mine """
+		cols = self.colDimension
+		for byteIndex, byte in enumerate(self.mines):
+			while byte:
+				low = byte & -byte
+				i = (byteIndex << 3) + low.bit_length() - 1
+				yield (i % cols, i // cols)
+				byte ^= low
+
+	def __repr__(self):
+		return "WorldDefinition({}, {}x{}, {} mines)".format(self.name, self.rowDimension, self.colDimension, self.totalMines)
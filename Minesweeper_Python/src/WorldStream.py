@@ -0,0 +1,83 @@
+# ==============================CS-199==================================
+# FILE:			WorldStream.py
+#
+# DESCRIPTION:	This file generates WorldDefinitions in memory, so worlds
+#				can be played without ever touching the filesystem.
+#				streamWorlds yields the worlds one at a time, each one
+#				sampled from its own seed.
+#
+# NOTES: 		- Difficulties are "beginner" (8x8, 10 mines),
+#				  "intermediate" (16x16, 40 mines), "expert" (16x30, 99
+#				  mines), or a custom "ROWSxCOLSxMINES" string.
+#
+#				- World i of a stream only depends on (seed, i), so a
+#				  single world can be regenerated with generateWorld,
+#				  and the streams of different seeds are unrelated.
+#
+#				- Worlds are sampled like the bulk generation of
+#				  WorldGenerator.py: every tile gets a SplitMix64 hash of
+#				  (seed, i, tile), and the smallest hashes outside the
+#				  starting tile and the tiles around it become mines.
+#				  So world i of the stream with seed S is the same board
+#				  as world i+1 of "WorldGenerator.py --seed S".
+# ==============================CS-199==================================
+
+import heapq
+from WorldDefinition import WorldDefinition
+
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+DIFFICULTIES = {
+	"beginner": (8, 8, 10),
+	"intermediate": (16, 16, 40),
+	"expert": (16, 30, 99),
+}
+
+
+def parseDifficulty(difficulty: str) -> "tuple of ints":
+	""" Return (rowDimension, colDimension, totalMines) for a difficulty name or "ROWSxCOLSxMINES" """
+	if difficulty.lower() in DIFFICULTIES:
+		return DIFFICULTIES[difficulty.lower()]
+	try:
+		rowDimension, colDimension, totalMines = [int(x) for x in difficulty.lower().split("x")]
+	except ValueError:
+		raise ValueError('Unknown difficulty: ' + difficulty)
+	if rowDimension < 4 or colDimension < 4 or totalMines < 1 or totalMines > rowDimension * colDimension - 9:
+		raise ValueError('Invalid difficulty: ' + difficulty)
+	return rowDimension, colDimension, totalMines
+
+
+def mix64(z: int) -> int:
+	""" SplitMix64 finalizer """
+	z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+	z = (z ^ (z >> 27)) * 0x94D049BB133111EB & MASK64
+	return z ^ (z >> 31)
+
+
+def generateWorld(difficulty: str, seed: int, index: int) -> WorldDefinition:
+	""" Sample world number index of the stream with the given difficulty and seed """
+	rowDimension, colDimension, totalMines = parseDifficulty(difficulty)
+	base = mix64((mix64(seed * GOLDEN_GAMMA & MASK64) + index * GOLDEN_GAMMA) & MASK64)
+	keys = [mix64((base + j * GOLDEN_GAMMA) & MASK64) for j in range(rowDimension * colDimension + 2)]
+
+	startX = keys[0] % colDimension
+	startY = keys[1] % rowDimension
+	startingPatch = set()
+	for c in range(max(startX-1, 0), min(startX+2, colDimension)):
+		for r in range(max(startY-1, 0), min(startY+2, rowDimension)):
+			startingPatch.add(r * colDimension + c)
+
+	candidates = [(keys[i+2], i) for i in range(rowDimension * colDimension) if i not in startingPatch]
+	mines = bytearray((rowDimension * colDimension + 7) // 8)
+	for _, i in heapq.nsmallest(totalMines, candidates):
+		mines[i >> 3] |= 1 << (i & 7)
+
+	name = "{}_world_{}_{}".format(difficulty, seed, index + 1)
+	return WorldDefinition(name, rowDimension, colDimension, startX, startY, totalMines, bytes(mines))
+
+
+def streamWorlds(numWorlds: int, difficulty: str, seed: int) -> "generator of WorldDefinition":
+	""" Yield numWorlds worlds of the given difficulty """
+	for i in range(numWorlds):
+		yield generateWorld(difficulty, seed, i)
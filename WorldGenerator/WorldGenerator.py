@@ -20,6 +20,21 @@
 #
 #				- The minimum row and column dimension is 4.
 #				- The minimum number of mines is 1.
+#
+#				- "--seed SEED" switches to bulk generation: world i of
+#				  the run is sampled from (SEED, i-1) alone, so any
+#				  world can be regenerated on its own. "--spec NUMWORLDS
+#				  BASEFILENAME ROWS COLS MINES" may be repeated to create
+#				  several sets in one run, the world numbers carrying on
+#				  from one set to the next. "--corpus CORPUSFILE" writes
+#				  the worlds into a corpus instead of world files.
+#
+#				- Bulk generation uses NumPy when it is installed. The
+#				  pure Python fallback creates exactly the same worlds.
+#
+#				- "--pack DIRECTORY CORPUSFILE" converts every world file
+#				  under DIRECTORY into a single corpus file. The corpus
+#				  format is documented in WorldCorpus.py, which reads it.
 #				
 #				- DO NOT MAKE CHANGES TO THIS FILE.
 # ==============================CS-199==================================
@@ -27,6 +42,26 @@
 import random
 import os
 import argparse
+import struct
+import heapq
+
+CORPUS_MAGIC = b"MSWC"
+CORPUS_VERSION = 1
+CORPUS_HEADER = struct.Struct("<4sHHIQ")
+CORPUS_RECORD = struct.Struct("<HHHHIH")
+CORPUS_OFFSET = struct.Struct("<Q")
+CORPUS_BUFFER_SIZE = 1 << 20
+
+BULK_BATCH_SIZE = 4096
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+PATCH_OFFSETS = [(0, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0)]
+
+try:
+	import numpy as np
+	numpy_installed = True
+except ImportError:
+	numpy_installed = False
 
 
 def generateWorlds(numWorlds: int, baseFileName: "string", rowDimension: int, colDimension: int, numMines: int) -> None:
@@ -36,9 +71,8 @@ def generateWorlds(numWorlds: int, baseFileName: "string", rowDimension: int, co
 		createWorldFile(baseFileName+str(i), rowDimension, colDimension, numMines)
 
 
-def createWorldFile(filename: "string", rowDimension: int, colDimension: int, numMines: int) -> None:
-	""" Create a single Minesweeper world file """
-	# print("Creating world " + filename + "...")
+def __worldFilePath(filename: "string") -> "string":
+	""" Return the path of a world file, inside Problems/<difficulty> when that folder exists """
 	dir_name = os.path.abspath("Problems")
 	
 	difficulty_name = filename.split("_", 1)[0]
@@ -47,7 +81,13 @@ def createWorldFile(filename: "string", rowDimension: int, colDimension: int, nu
 	else:
 	    directory_name = dir_name
 	
-	file_path = os.path.join(directory_name, filename+".txt")
+	return os.path.join(directory_name, filename+".txt")
+
+
+def createWorldFile(filename: "string", rowDimension: int, colDimension: int, numMines: int) -> None:
+	""" Create a single Minesweeper world file """
+	# print("Creating world " + filename + "...")
+	file_path = __worldFilePath(filename)
 	# print(file_path)
 
 	nRows = rowDimension
@@ -94,6 +134,177 @@ def createWorldFile(filename: "string", rowDimension: int, colDimension: int, nu
 		print("ERROR: Failed to open file")
 
 
+class CorpusWriter():
+	""" Writes worlds into a single corpus file, buffering records in large batches """
+
+	def __init__(self, corpusFile: "string"):
+		self.__file = open(corpusFile, 'wb')
+		self.__file.write(CORPUS_HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, 0, 0, 0))
+		self.__offset = CORPUS_HEADER.size
+		self.__offsets = []
+		self.__buffer = []
+		self.__bufferSize = 0
+
+	def add(self, name: "string", rowDimension: int, colDimension: int, startX: int, startY: int, mineCoords: "list of (x, y)") -> None:
+		""" Add a world, using the 1-indexed coordinates of the world files """
+		bitmap = bytearray((rowDimension * colDimension + 7) // 8)
+		for x, y in mineCoords:
+			i = (y-1) * colDimension + (x-1)
+			bitmap[i >> 3] |= 1 << (i & 7)
+		self.addPacked(name, rowDimension, colDimension, startX-1, startY-1, len(mineCoords), bitmap)
+
+	def addPacked(self, name: "string", rowDimension: int, colDimension: int, startX: int, startY: int, numMines: int, bitmap: "bytes") -> None:
+		""" Add a world whose start tile is 0-indexed and whose mines are already a bitmap """
+		encodedName = name.encode('utf-8')
+		record = CORPUS_RECORD.pack(rowDimension, colDimension, startX, startY, numMines, len(encodedName)) + encodedName + bitmap
+		self.__offsets.append(self.__offset)
+		self.__offset += len(record)
+		self.__buffer.append(record)
+		self.__bufferSize += len(record)
+		if self.__bufferSize >= CORPUS_BUFFER_SIZE:
+			self.__flush()
+
+	def close(self) -> None:
+		""" Write the index, then patch the header with the record count and index offset """
+		self.__flush()
+		self.__file.write(struct.pack("<{}Q".format(len(self.__offsets)), *self.__offsets))
+		self.__file.seek(0)
+		self.__file.write(CORPUS_HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, 0, len(self.__offsets), self.__offset))
+		self.__file.close()
+
+	def __flush(self) -> None:
+		self.__file.write(b"".join(self.__buffer))
+		self.__buffer = []
+		self.__bufferSize = 0
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+
+def readWorldFile(filename: "string") -> tuple:
+	""" Parse a world file into (rowDimension, colDimension, startX, startY, mineCoords) """
+	with open(filename, 'r') as file:
+		rowDimension, colDimension = [int(x) for x in file.readline().split()]
+		startX, startY = [int(x) for x in file.readline().split()]
+		mineCoords = []
+		for y, line in zip(range(rowDimension, 0, -1), file):
+			for x, tile in enumerate(line.split(), 1):
+				if tile == "1":
+					mineCoords.append((x, y))
+	return rowDimension, colDimension, startX, startY, mineCoords
+
+
+def packWorlds(directory: "string", corpusFile: "string") -> int:
+	""" Convert every world file under directory into a single corpus file """
+	""" Worlds are stored in sorted path order and named by their path relative to directory """
+	worlds = []
+	for dirpath, _, filenames in os.walk(directory):
+		for filename in filenames:
+			worlds.append(os.path.join(dirpath, filename))
+
+	with CorpusWriter(corpusFile) as writer:
+		for world in sorted(worlds):
+			writer.add(os.path.relpath(world, directory), *readWorldFile(world))
+	return len(worlds)
+
+
+def sampleWorlds(seed: int, indices: "list of ints", rowDimension: int, colDimension: int, numMines: int) -> "list of (startX, startY, bitmap)":
+	""" Sample world number index of the seed for every index, returning the 1-indexed start tile and the mine bitmap of each """
+	""" Every tile gets a hash of (seed, index, tile), and the numMines smallest hashes outside the starting patch become mines """
+	if numpy_installed:
+		return __sampleWorldsNumpy(seed, indices, rowDimension, colDimension, numMines)
+	return [__sampleWorld(seed, index, rowDimension, colDimension, numMines) for index in indices]
+
+
+def generateBulk(numWorlds: int, baseFileName: "string", rowDimension: int, colDimension: int, numMines: int, seed: int, writer: CorpusWriter = None, firstIndex: int = 0) -> None:
+	""" Generates N worlds, numbers firstIndex .. firstIndex+N-1 of the seed, in batches of BULK_BATCH_SIZE """
+	""" Worlds are added to writer when one is given, otherwise each is written to its own text file """
+	for first in range(0, numWorlds, BULK_BATCH_SIZE):
+		count = min(BULK_BATCH_SIZE, numWorlds - first)
+		worlds = sampleWorlds(seed, range(firstIndex + first, firstIndex + first + count), rowDimension, colDimension, numMines)
+		for i, (startX, startY, bitmap) in enumerate(worlds, first + 1):
+			filename = baseFileName + str(i)
+			if writer:
+				writer.addPacked(filename + ".txt", rowDimension, colDimension, startX-1, startY-1, numMines, bitmap)
+			else:
+				__writeBitmapWorld(filename, rowDimension, colDimension, startX, startY, bitmap)
+
+
+def __writeBitmapWorld(filename: "string", rowDimension: int, colDimension: int, startX: int, startY: int, bitmap: "bytes") -> None:
+	""" Write a world file with a single write call """
+	bits = int.from_bytes(bitmap, 'little')
+	lines = [str(rowDimension) + " " + str(colDimension) + "\n", str(startX) + " " + str(startY) + "\n"]
+	for y in range(rowDimension - 1, -1, -1):
+		row = bits >> (y * colDimension)
+		lines.append("".join("1 " if row >> x & 1 else "0 " for x in range(colDimension)) + "\n")
+	try:
+		with open(__worldFilePath(filename), 'w') as file:
+			file.write("".join(lines))
+	except:
+		print("ERROR: Failed to open file")
+
+
+def __mix64(z: int) -> int:
+	""" SplitMix64 finalizer """
+	z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+	z = (z ^ (z >> 27)) * 0x94D049BB133111EB & MASK64
+	return z ^ (z >> 31)
+
+
+def __sampleWorld(seed: int, index: int, rowDimension: int, colDimension: int, numMines: int) -> tuple:
+	""" Pure Python version of sampleWorlds for a single world """
+	base = __mix64((__mix64(seed * GOLDEN_GAMMA & MASK64) + index * GOLDEN_GAMMA) & MASK64)
+	keys = [__mix64((base + j * GOLDEN_GAMMA) & MASK64) for j in range(rowDimension * colDimension + 2)]
+	startX = 1 + keys[0] % colDimension
+	startY = 1 + keys[1] % rowDimension
+
+	patch = set()
+	for dx, dy in PATCH_OFFSETS:
+		if __isInBounds(startX+dx, startY+dy, rowDimension, colDimension):
+			patch.add((startY+dy-1) * colDimension + (startX+dx-1))
+	candidates = [(keys[i+2], i) for i in range(rowDimension * colDimension) if i not in patch]
+
+	bitmap = bytearray((rowDimension * colDimension + 7) // 8)
+	for _, i in heapq.nsmallest(numMines, candidates):
+		bitmap[i >> 3] |= 1 << (i & 7)
+	return startX, startY, bytes(bitmap)
+
+
+def __mix64Array(z: "numpy array") -> "numpy array":
+	""" SplitMix64 finalizer over a uint64 array, wrapping like __mix64 """
+	z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+	z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+	return z ^ (z >> np.uint64(31))
+
+
+def __sampleWorldsNumpy(seed: int, indices: "list of ints", rowDimension: int, colDimension: int, numMines: int) -> list:
+	""" NumPy version of sampleWorlds, hashing and selecting the mines of the whole batch at once """
+	nCells = rowDimension * colDimension
+	indices = np.asarray(indices, dtype=np.int64).astype(np.uint64)
+	base = __mix64Array(np.uint64(__mix64(seed * GOLDEN_GAMMA & MASK64)) + indices * np.uint64(GOLDEN_GAMMA))
+	keys = __mix64Array(base[:, None] + np.arange(nCells + 2, dtype=np.uint64) * np.uint64(GOLDEN_GAMMA))
+	startX = 1 + (keys[:, 0] % np.uint64(colDimension)).astype(np.int64)
+	startY = 1 + (keys[:, 1] % np.uint64(rowDimension)).astype(np.int64)
+
+	# Tiles of the starting patch get the largest possible key, so they are never chosen
+	cellKeys = keys[:, 2:]
+	boards = np.arange(len(indices))
+	for dx, dy in PATCH_OFFSETS:
+		x = startX + dx
+		y = startY + dy
+		valid = (x >= 1) & (x <= colDimension) & (y >= 1) & (y <= rowDimension)
+		cellKeys[boards[valid], ((y-1) * colDimension + (x-1))[valid]] = np.uint64(MASK64)
+
+	chosen = np.argpartition(cellKeys, numMines - 1, axis=1)[:, :numMines]
+	mines = np.zeros((len(indices), nCells), dtype=bool)
+	mines[boards[:, None], chosen] = True
+	bitmaps = np.packbits(mines, axis=1, bitorder='little')
+	return [(int(startX[b]), int(startY[b]), bitmaps[b].tobytes()) for b in boards]
+
+
 def __randomInt(limit: int) -> int:
 	""" Return a random between 1 and limit """
 	return random.randrange(1, limit)
@@ -109,24 +320,52 @@ def main():
 	parser = argparse.ArgumentParser(description="Process command line arugments for world generation")
 
 	# Parse options																													# Help is default
-	parser.add_argument("numFiles", help="Number of world files to create", action="store", type=int)								# Number of files
-	parser.add_argument("filename", help="Base filename", action="store")															# Base filename
-	parser.add_argument("rowDimension", help="Number of rows", action="store", type=int)
-	parser.add_argument("colDimension", help="Number of columns", action="store", type=int)
-	parser.add_argument("numMines", help="Number of mines", action="store", type=int)
+	parser.add_argument("numFiles", help="Number of world files to create", action="store", type=int, nargs="?")					# Number of files
+	parser.add_argument("filename", help="Base filename", action="store", nargs="?")												# Base filename
+	parser.add_argument("rowDimension", help="Number of rows", action="store", type=int, nargs="?")
+	parser.add_argument("colDimension", help="Number of columns", action="store", type=int, nargs="?")
+	parser.add_argument("numMines", help="Number of mines", action="store", type=int, nargs="?")
+	parser.add_argument("--spec", help="Another set of worlds to create", nargs=5, action="append", metavar=("NUMFILES", "FILENAME", "ROWS", "COLS", "MINES"))
+	parser.add_argument("--seed", help="Seed of the worlds, enables bulk generation", type=int)
+	parser.add_argument("--corpus", help="Write the worlds into this corpus file")
+	parser.add_argument("--pack", help="Pack a directory of world files into a corpus file", nargs=2, metavar=("DIRECTORY", "CORPUSFILE"))
 
 	args = parser.parse_args()
 
-	numFiles = args.numFiles
-	filename = args.filename
-	rowDimension = args.rowDimension
-	colDimension = args.colDimension
-	numMines = args.numMines
-	
-	if (rowDimension >= 4 and colDimension >= 4 and (numMines <= rowDimension*colDimension - 9) and numMines >= 1):
-		generateWorlds(numFiles, filename, rowDimension, colDimension, numMines)
-	else:
-		print("ERROR: Could not generate worlds! \n\trowDimension >= 4, colDimension >= 4, 1 <= numMines <= (rowDimension*colDimension - 9)")
+	if args.pack:
+		directory, corpusFile = args.pack
+		if not os.path.isdir(directory):
+			print("ERROR: Directory does not exist!")
+			return
+		print("Packed {} worlds into {}".format(packWorlds(directory, corpusFile), corpusFile))
+		return
+
+	specs = []
+	if args.numMines is not None:
+		specs.append((args.numFiles, args.filename, args.rowDimension, args.colDimension, args.numMines))
+	for numFiles, filename, rowDimension, colDimension, numMines in args.spec or []:
+		specs.append((int(numFiles), filename, int(rowDimension), int(colDimension), int(numMines)))
+	if not specs:
+		parser.error("numFiles, filename, rowDimension, colDimension and numMines are required")
+
+	for numFiles, filename, rowDimension, colDimension, numMines in specs:
+		if not (rowDimension >= 4 and colDimension >= 4 and (numMines <= rowDimension*colDimension - 9) and numMines >= 1):
+			print("ERROR: Could not generate worlds! \n\trowDimension >= 4, colDimension >= 4, 1 <= numMines <= (rowDimension*colDimension - 9)")
+			return
+
+	if args.seed is None and not args.corpus:
+		for spec in specs:
+			generateWorlds(*spec)
+		return
+
+	seed = args.seed if args.seed is not None else random.randrange(1 << 62)
+	writer = CorpusWriter(args.corpus) if args.corpus else None
+	firstIndex = 0
+	for spec in specs:
+		generateBulk(*spec, seed, writer, firstIndex)
+		firstIndex += spec[0]
+	if writer:
+		writer.close()
 
 
 if __name__ == "__main__":
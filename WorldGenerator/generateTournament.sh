@@ -3,10 +3,10 @@
 rm -rf Problems
 mkdir Problems
  
-python3 WorldGenerator.py 1000 Beginner_world_ 8 8 10
-
-python3 WorldGenerator.py 1000 Intermediate_world_ 16 16 40
-
-python3 WorldGenerator.py 1000 Expert_world_ 16 30 99
+# Pass a seed as the first argument to regenerate the same tournament
+python3 WorldGenerator.py --seed ${1:-$RANDOM} \
+	--spec 1000 Beginner_world_ 8 8 10 \
+	--spec 1000 Intermediate_world_ 16 16 40 \
+	--spec 1000 Expert_world_ 16 30 99
 
 echo Finished generating worlds!
@@ -0,0 +1,5 @@
+#!/bin/bash
+
+python3 WorldGenerator.py --pack Problems Problems.corpus
+
+echo Finished packing worlds!